@@ -1,12 +1,27 @@
+from __future__ import annotations
 from enum import Enum
 import Moves as Moves
 from Hand import Hand
-from typing import List
-from random import choice
+from typing import List, Dict, Tuple, Union
+from GameRandom import choice, randrange
+from collections import Counter
 from Heuristics import *
 import Player
 import GameSession
 from copy import deepcopy
+from math import log, sqrt, log2, ceil
+from itertools import count
+import time
+import uuid
+import GameConstants as Consts
+import Dice
+import GameRandom
+from ParallelEvaluator import ParallelEvaluator
+from Budget import Budget
+import ParallelSearch
+import WinSolver
+import TurnPlanner
+import RobberEvaluator
 
 # import tensorflow as tf
 # from keras.models import Sequential
@@ -14,6 +29,47 @@ from copy import deepcopy
 # from DQN import get_move_predictions
 
 
+# cheap move ordering: builds first, then dev cards, trades and passing (see by_priority)
+MOVE_PRIORITY = ((Moves.MoveType.BUILD, Consts.PurchasableType.CITY),
+                 (Moves.MoveType.BUILD, Consts.PurchasableType.SETTLEMENT),
+                 (Moves.MoveType.USE_DEV, None),
+                 (Moves.MoveType.BUY_DEV, None),
+                 (Moves.MoveType.BUILD, Consts.PurchasableType.ROAD),
+                 (Moves.MoveType.TRADE, None),
+                 (Moves.MoveType.PASS, None))
+
+
+def by_priority(moves: List[Moves.Move]) -> List[Moves.Move]:
+    """:returns moves ordered by MOVE_PRIORITY (discards of the most plentiful resources first), the likely better
+    moves first. searches look at moves in this order to find good moves (and bounds) early"""
+    def priority(move: Moves.Move) -> Tuple[int, int]:
+        if move.get_type() == Moves.MoveType.THROW:
+            hand = Counter(move.player().resource_hand())
+            return 0, -sum(hand[card] for card in move.throws())
+        kind = (move.get_type(), move.builds() if move.get_type() == Moves.MoveType.BUILD else None)
+        return (MOVE_PRIORITY.index(kind), 0) if kind in MOVE_PRIORITY else (0, 0)
+    return sorted(moves, key=priority)
+
+
+def forced_win_move(moves: List[Moves.Move], state: GameSession) -> Union[Moves.Move, None]:
+    """:returns the move of moves that starts a win within the current turn (see WinSolver), None if no win is
+    found. searching agents play it without searching (see Agent.pre_decision)"""
+    win = WinSolver.winning_moves(state)
+    if win is None:
+        return None
+    return next((move for move in moves if move.key() == win[0].key()), None)
+
+
+def analytic_robber_moves(moves: List[Moves.Move], state: GameSession) -> List[Moves.Move]:
+    """:returns moves with their robber placements (a 7's or a knight's) cut down to the best one by the analytic
+    evaluator (see RobberEvaluator), so agents simulate one placement at most"""
+    knight_moves = [move for move in moves if isinstance(move, Moves.UseKnightDevMove)]
+    if len(knight_moves) <= 1:
+        return moves
+    best_knight_move = RobberEvaluator.best_placement(knight_moves, state)
+    return [move for move in moves if not isinstance(move, Moves.UseKnightDevMove) or move is best_knight_move]
+
+
 class AgentType(Enum):
     """Enum representing Agent types"""
     RANDOM = 0
@@ -23,18 +79,44 @@ class AgentType(Enum):
     MONTECARLO = 4
     DQN = 5
     OPTIMIZED = 6
+    UCT = 7
+    RULE_BASED = 8
+    EXPECTIMAX = 9
+    TURN_PLANNING = 10
 
     def __str__(self):
         return self.name
 
 
+class AgentContext:
+    """The state an agent keeps between the decisions of one seat in one game (a search tree to reuse, a plan being
+    played). Every player holds the context of its seat (see Player.agent_context), so an agent itself holds only
+    its configuration, and one agent instance can play any number of seats of any number of concurrent games"""
+    def __init__(self):
+        self.__key = uuid.uuid4().hex
+        self.__values = {}
+
+    def key(self) -> str:
+        """:returns a key unique to this context (in other processes too)"""
+        return self.__key
+
+    def get(self, agent: Agent, name: str, default=None):
+        """:returns the value agent kept by name, default if it kept none"""
+        return self.__values.get((agent.id(), name), default)
+
+    def set(self, agent: Agent, name: str, value) -> None:
+        """keeps value by name for agent, for its next decisions of the seat"""
+        self.__values[(agent.id(), name)] = value
+
+
 class Agent:
-    """Class representing an AI agent that can choose a move based on a strategy / AI paradigm"""
-    ID_GEN = 0
+    """Class representing an AI agent that can choose a move based on a strategy / AI paradigm.
+    An agent holds its configuration only, what it keeps between decisions is kept in the context of the seat it
+    plays (see AgentContext)"""
+    ID_GEN = count(1)
 
     def __init__(self, agent_type: AgentType):
-        Agent.ID_GEN += 1
-        self.__id = Agent.ID_GEN
+        self.__id = next(Agent.ID_GEN)
         self.__type = agent_type
 
     def type(self) -> AgentType:
@@ -45,8 +127,43 @@ class Agent:
         """:returns the unique id of this agent instance"""
         return self.__id
 
-    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession) -> Moves.Move:
-        """:returns a chosen move from moves"""
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession,
+               budget: Budget = None) -> Moves.Move:
+        """:returns a chosen move from moves. agents that search keep to budget (the decision's time and / or
+        simulations, unlimited if None), answering with their best move so far once it's spent"""
+        raise NotImplemented
+
+    def pre_decision(self, moves: List[Moves.Move], state: GameSession,
+                     analytic_robber: bool = False) -> Tuple[Union[Moves.Move, None], List[Moves.Move]]:
+        """the steps every searching agent takes before its own decision (call first thing in choose).
+        :returns a move to play without deciding (the only move, or one that starts a win within the turn, see
+        forced_win_move), None if there's none, and the moves left to decide between (with analytic_robber, the
+        robber placements cut down to the best one, see analytic_robber_moves)"""
+        if len(moves) == 1:
+            return moves[0], moves
+        win_move = forced_win_move(moves, state)
+        if win_move is not None:
+            return win_move, moves
+        if analytic_robber:
+            moves = analytic_robber_moves(moves, state)
+            if len(moves) == 1:
+                return moves[0], moves
+        return None, moves
+
+    def game_over(self, player: Player) -> None:
+        """called once the game of player's seat is over, for the agent to release what it keeps for the seat
+        outside the seat's context. does nothing by default"""
+        pass
+
+    def samples_moves(self) -> bool:
+        """:returns True if this agent draws its moves with sample() instead of choose(), so the game session
+        doesn't have to list the moves or copy its state for it"""
+        return False
+
+    def sample(self, move_counts: Dict[Tuple[Moves.MoveType, GameSession.MoveSubtype], int],
+               player: Player) -> Tuple[Moves.MoveType, GameSession.MoveSubtype, int]:
+        """:returns the (move type, subtype, index) of a move drawn from move_counts, which maps every
+        (move type, subtype) kind that can be played to its number of moves"""
         raise NotImplemented
 
     def __str__(self):
@@ -58,23 +175,20 @@ class RandomAgent(Agent):
     def __init__(self):
         super().__init__(AgentType.RANDOM)
 
-    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession):
-        # choose uniformly between move TYPES first, then uniformly between moves within that type #
-        available_move_types = list(set([m.get_type() for m in moves]))
-        move_type = choice(available_move_types)
-        filtered_moves = [m for m in moves if m.get_type() == move_type]
-
-        if move_type == Moves.MoveType.BUILD:  # from build moves choose uniformly from buildables
-            available_build_types = list(set([m.builds() for m in filtered_moves]))
-            build_type = choice(available_build_types)
-            filtered_moves = [m for m in filtered_moves if m.builds() == build_type]
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession, budget: Budget = None):
+        move_type, subtype, idx = self.sample(Counter((m.get_type(), m.subtype()) for m in moves), player)
+        return [m for m in moves if m.get_type() == move_type and m.subtype() == subtype][idx]
 
-        elif move_type == Moves.MoveType.USE_DEV:  # same for dev cards
-            available_dev_types = list(set([m.uses() for m in filtered_moves]))
-            dev_type = choice(available_dev_types)
-            filtered_moves = [m for m in filtered_moves if m.uses() == dev_type]
+    def samples_moves(self) -> bool:
+        return True
 
-        return choice(filtered_moves)
+    def sample(self, move_counts: Dict[Tuple[Moves.MoveType, GameSession.MoveSubtype], int],
+               player: Player) -> Tuple[Moves.MoveType, GameSession.MoveSubtype, int]:
+        # choose uniformly between move TYPES first, then uniformly between buildables (for build moves) or
+        # dev cards (for dev moves), then uniformly between moves of that kind #
+        move_type = choice(list(dict.fromkeys(mtype for mtype, _ in move_counts)))
+        subtype = choice([st for mtype, st in move_counts if mtype == move_type])
+        return move_type, subtype, randrange(move_counts[(move_type, subtype)])
 
 
 class HumanAgent(Agent):
@@ -83,7 +197,8 @@ class HumanAgent(Agent):
         super().__init__(AgentType.HUMAN)
         self.__name = name
 
-    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession) -> Moves.Move:
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession,
+               budget: Budget = None) -> Moves.Move:
         inpt = input('Player {}, choose move by index (or n = nodes map, e = edges map, b = board, m = moves list):'
                      '\n{}\n'.format(player, '\n'.join('{:3} - {}'.format(i, m.info()) for i, m in enumerate(moves))))
         while True:
@@ -112,23 +227,23 @@ class HumanAgent(Agent):
 class OneMoveHeuristicAgent(Agent):
     """An agent that gets a heuristic, chooses a move that maximizes that heuristic value"""
     # Open the tree only one move forward and apply the given heuristic on it
-    def __init__(self, heuristic):
+    def __init__(self, heuristic, num_workers: int = 0, analytic_robber: bool = True):
+        """num_workers > 0 evaluates the candidate moves on that many worker processes (with identical results).
+        analytic_robber places the robber by RobberEvaluator instead of simulating every placement"""
         super().__init__(AgentType.ONE_MOVE)
         self.__h = heuristic
         self.__randy = RandomAgent()
+        self.__evaluator = ParallelEvaluator(num_workers)
+        self.__analytic_robber = analytic_robber
 
-    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession) -> Moves.Move:
-        move_values = []
-        for move in moves:
-            new_state = deepcopy(state)
-            new_state.simulate_game(move)
-            curr_p = move.player()
-            for p in new_state.players():
-                if p == move.player():
-                    curr_p = p
-            hval = self.__h.value(new_state, curr_p)
-            move_values.append(hval)
-            del new_state
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession,
+               budget: Budget = None) -> Moves.Move:
+        decided_move, moves = self.pre_decision(moves, state, self.__analytic_robber)
+        if decided_move is not None:
+            return decided_move
+        if budget is not None:  # the likely better moves are evaluated before the budget is spent
+            moves = by_priority(moves)
+        move_values = self.__evaluator.evaluate(state, moves, self.move_value, budget)
 
         max_val = max(move_values)
         argmax_vals_indices = [i for i, val in enumerate(move_values) if val == max_val]
@@ -136,6 +251,16 @@ class OneMoveHeuristicAgent(Agent):
         move = self.__randy.choose(moves, player, state)
         return move
 
+    def move_value(self, state: GameSession, move: Moves.Move) -> float:
+        """:returns the heuristic value of the state reached by playing move in state"""
+        new_state = deepcopy(state)
+        new_state.simulate_game(move)
+        return self.__h.value(new_state, find_sim_player(new_state, move.player()))
+
+    def close(self) -> None:
+        """shuts down the worker processes evaluating the moves, if any"""
+        self.__evaluator.close()
+
 
 class ProbabilityAgent(Agent):
     """An agent that chooses a move that maximizes the probability heuristic"""
@@ -143,39 +268,31 @@ class ProbabilityAgent(Agent):
         super().__init__(AgentType.PROBABILITY)
         self.__harry = OneMoveHeuristicAgent(Probability())
 
-    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession) -> Moves.Move:
-        return self.__harry.choose(moves, player, state)
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession,
+               budget: Budget = None) -> Moves.Move:
+        return self.__harry.choose(moves, player, state, budget)
 
 
 class OptimizedHeuristicAgent(Agent):
     """A heuristic agent that implements helper functions that score move types as well as states"""
     # using the one move heuristic method
-    def __init__(self, heuristic):
+    def __init__(self, heuristic, num_workers: int = 0, analytic_robber: bool = True):
+        """num_workers > 0 evaluates the candidate moves on that many worker processes (with identical results).
+        analytic_robber places the robber by RobberEvaluator instead of simulating every placement"""
         super().__init__(AgentType.OPTIMIZED)
         self.__h = heuristic
         self.__randy = RandomAgent()
+        self.__evaluator = ParallelEvaluator(num_workers)
+        self.__analytic_robber = analytic_robber
 
-    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession) -> Moves.Move:
-        h_val = 0
-        move_values = []
-        for move in moves:
-            # improve choice of monopoly dev card before simulating new state:
-            if isinstance(move, Moves.UseMonopolyDevMove):
-                h_val += self.optimize_monopoly_choice(state, player, deepcopy(move))
-            new_state = deepcopy(state)
-            new_state.simulate_game(move)
-            curr_p = move.player()
-            for p in new_state.players():
-                if p == move.player():
-                    curr_p = p
-
-            h_val = self.__h.value(new_state, curr_p)
-            # improve trading abilities:
-            if move.get_type() == Moves.MoveType.TRADE:
-                h_val += self.optimized_trading_choice(new_state, curr_p, deepcopy(move)) / 2
-
-            move_values.append(h_val)
-            del new_state
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession,
+               budget: Budget = None) -> Moves.Move:
+        decided_move, moves = self.pre_decision(moves, state, self.__analytic_robber)
+        if decided_move is not None:
+            return decided_move
+        if budget is not None:  # the likely better moves are evaluated before the budget is spent
+            moves = by_priority(moves)
+        move_values = self.__evaluator.evaluate(state, moves, self.move_value, budget)
 
         max_val = max(move_values)
         argmax_vals_indices = [i for i, val in enumerate(move_values) if val == max_val]
@@ -183,6 +300,27 @@ class OptimizedHeuristicAgent(Agent):
         move = self.__randy.choose(moves, player, state)
         return move
 
+    def move_value(self, state: GameSession, move: Moves.Move) -> float:
+        """:returns the heuristic value of the state reached by playing move in state, plus the monopoly and
+        trading bonuses of move"""
+        h_val = 0
+        # improve choice of monopoly dev card before simulating new state:
+        if isinstance(move, Moves.UseMonopolyDevMove):
+            h_val += self.optimize_monopoly_choice(state, move.player(), deepcopy(move))
+        new_state = deepcopy(state)
+        new_state.simulate_game(move)
+        curr_p = find_sim_player(new_state, move.player())
+
+        h_val += self.__h.value(new_state, curr_p)
+        # improve trading abilities:
+        if move.get_type() == Moves.MoveType.TRADE:
+            h_val += self.optimized_trading_choice(new_state, curr_p, deepcopy(move)) / 2
+        return h_val
+
+    def close(self) -> None:
+        """shuts down the worker processes evaluating the moves, if any"""
+        self.__evaluator.close()
+
     @staticmethod
     def optimize_monopoly_choice(session: GameSession, player: Player, move: Moves):
         """
@@ -222,7 +360,7 @@ class OptimizedHeuristicAgent(Agent):
             __board = session.board()
             res_types_from_dice = __board.resources_player_can_get(player)
             gets_type = move.gets().get_cards_types().pop()
-            num_instances_gets_type = res_hand.cards_of_type(gets_type)
+            num_instances_gets_type = res_hand.cards_of_type(gets_type).size()
 
             # if what you get from trading you can't achieve from dice:
             if gets_type not in res_types_from_dice:
@@ -231,44 +369,146 @@ class OptimizedHeuristicAgent(Agent):
         return score
 
 
+class RuleBasedAgent(Agent):
+    """A cheap agent that plays by a fixed priority list, looking only at its hand and the moves (no state copies):
+    city > settlement > dev card (playing one, else buying one) > road > a trade that makes one of those
+    affordable > pass.
+    Discards down to the most even hand, robs an opponent when it can (one that might win on its next turn, if any),
+    and plays any other decision randomly"""
+    TARGETS = (Consts.PurchasableType.CITY,
+               Consts.PurchasableType.SETTLEMENT,
+               Consts.PurchasableType.DEV_CARD,
+               Consts.PurchasableType.ROAD)
+
+    def __init__(self):
+        super().__init__(AgentType.RULE_BASED)
+        self.__randy = RandomAgent()
+
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession,
+               budget: Budget = None) -> Moves.Move:
+        if all(move.get_type() == Moves.MoveType.THROW for move in moves):
+            hand = Counter(moves[0].player().resource_hand())
+            return min(moves, key=lambda move: sorted((hand - Counter(move.throws())).values(), reverse=True))
+
+        knight_moves = [move for move in moves if isinstance(move, Moves.UseKnightDevMove) and move.robber_activated()]
+        if knight_moves:
+            robbing_moves = [move for move in knight_moves if move.take_from() is not None]
+            threats = WinSolver.next_turn_threats(state, moves[0].player()) if robbing_moves else []
+            threat_moves = [move for move in robbing_moves if move.take_from() in threats]
+            return choice(threat_moves or robbing_moves or knight_moves)
+
+        if not any(move.get_type() == Moves.MoveType.PASS for move in moves):  # not a main phase decision
+            return self.__randy.choose(moves, player, state)
+
+        for target in RuleBasedAgent.TARGETS:
+            if target == Consts.PurchasableType.DEV_CARD:
+                dev_moves = [move for move in moves if move.get_type() == Moves.MoveType.USE_DEV]
+                if dev_moves:
+                    return choice(dev_moves)
+            target_moves = [move for move in moves if RuleBasedAgent.__purchases(move) == target]
+            if target_moves:
+                return choice(target_moves)
+
+        hand = Counter(moves[0].player().resource_hand())
+        for target in RuleBasedAgent.TARGETS:
+            trade_moves = [move for move in moves
+                           if move.get_type() == Moves.MoveType.TRADE and
+                           RuleBasedAgent.__affordable_after(hand, move, target)]
+            if trade_moves:
+                return choice(trade_moves)
+
+        return next(move for move in moves if move.get_type() == Moves.MoveType.PASS)
+
+    @staticmethod
+    def __purchases(move: Moves.Move) -> Union[Consts.PurchasableType, None]:
+        if move.get_type() == Moves.MoveType.BUY_DEV:
+            return Consts.PurchasableType.DEV_CARD
+        if move.get_type() == Moves.MoveType.BUILD:
+            return move.builds()
+        return None
+
+    @staticmethod
+    def __affordable_after(hand: Counter, trade: Moves.TradeMove, target: Consts.PurchasableType) -> bool:
+        # trade makes target affordable, it isn't with hand (if it is, there's nowhere to build it or no card left)
+        hand_after = hand - Counter(trade.gives()) + Counter(trade.gets())
+        return not RuleBasedAgent.__affordable(hand, target) and RuleBasedAgent.__affordable(hand_after, target)
+
+    @staticmethod
+    def __affordable(hand: Counter, target: Consts.PurchasableType) -> bool:
+        return all(hand[card] >= amount for card, amount in Counter(Consts.COSTS[target]).items())
+
+
+class DiceSampling(Enum):
+    """Enum representing how the dice of a move's rollouts are sampled"""
+    INDEPENDENT = 0  # every roll on its own
+    STRATIFIED = 1  # the i-th rolls of a move's rollouts are spread over the sums by probability
+    COMMON = 2  # the k-th rollouts of all moves replay the same random numbers (common random numbers)
+
+    def __str__(self):
+        return self.name
+
+
 class MonteCarloAgent(Agent):
     """An agent that uses a limited depth variant of Monte Carlo (game) tree search with heavy playouts
-    (heuristic based). Tree traversal ends with current player's End-of-Turn."""
-    def __init__(self, heuristic, depth: int = 0, iters: int = 1):
+    (heuristic based). Tree traversal ends with current player's End-of-Turn.
+    Under a budget, the rollouts are spent in rounds over all the moves (the likely better ones first), so the
+    best move so far is always backed by some rollouts"""
+    TURN_SEARCH = 'turn_search'  # (player id, # moves played, move played key, continuation values) of last choice
+
+    def __init__(self, heuristic, depth: int = 0, iters: int = 1, halving: bool = False, rollout_agent: Agent = None,
+                 max_plies: int = None, max_turns: int = None, cutoff_vp_lead: int = None,
+                 dice_sampling: DiceSampling = DiceSampling.INDEPENDENT, fast_forward_opps: bool = False,
+                 reuse_turn_search: bool = True, analytic_robber: bool = True):
+        """iters rollouts are spent on every move, or with halving, iters * (# moves) rollouts are allocated by
+        successive halving (rounds of equal rollouts for the remaining moves, dropping the worse half each round).
+        rollout_agent plays my turns in the rollouts (e.g. a RuleBasedAgent), a OneMoveHeuristicAgent by default.
+        rollouts are truncated (and the state reached evaluated) after max_plies moves or max_turns turn changes,
+        and if cutoff_vp_lead is given, as soon as the game is over or a player leads the rest by that many VP.
+        dice_sampling sets how the dice of the rollouts are rolled (see DiceSampling).
+        fast_forward_opps plays the opponents' turns in the rollouts analytically (see GameSession.fast_forward_turn)
+        instead of move by move.
+        reuse_turn_search keeps the rollouts of the move played for the next decision of the same turn: the ones
+        that continued with a move count as rollouts of that move.
+        analytic_robber places the robber by RobberEvaluator (in the rollouts of the default rollout agent too)
+        instead of spending rollouts on every placement"""
         super().__init__(AgentType.MONTECARLO)
         self.__depth = depth
         self.__iterations = iters
+        self.__halving = halving
         self.__h = heuristic
-        self.__harry = OneMoveHeuristicAgent(heuristic)
+        self.__harry = OneMoveHeuristicAgent(heuristic, analytic_robber=analytic_robber)
         self.__randy = RandomAgent()
-        self.__curr_depth = 2
+        self.__rollout_agent = rollout_agent if rollout_agent is not None else self.__harry
+        self.__max_plies = max_plies
+        self.__max_turns = max_turns
+        self.__cutoff_vp_lead = cutoff_vp_lead
+        self.__dice_sampling = dice_sampling
+        self.__fast_forward_opps = fast_forward_opps
+        self.__reuse_turn_search = reuse_turn_search
+        self.__analytic_robber = analytic_robber
 
-    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession) -> Moves.Move:
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession,
+               budget: Budget = None) -> Moves.Move:
+        context = player.agent_context()
+        decided_move, moves = self.pre_decision(moves, state, self.__analytic_robber)
+        if decided_move is not None:
+            context.set(self, MonteCarloAgent.TURN_SEARCH, None)
+            return decided_move
         for p in state.players():
             if p == player:
                 player = p
                 break
 
-        self.__curr_depth -= 1
-        max_moves = moves
-        all_move_values = []
-        move_expected_vals = []
-
-        # simulate each move until end of my turn and add final state evaluation to move_expected_vals
-        for move_idx, move in enumerate(max_moves):
-            all_move_values.append([])
-            for _i in range(self.__iterations):
-                move_state = deepcopy(state)
-                move_state.simulate_game(move)
-                self.sim_me(move_state, player)
-                for _d in range(self.__depth):
-                    self.sim_me(move_state, player)
-                    self.sim_opps(move_state, player)
-                value_reached = self.__h.value(move_state, player)
-                all_move_values[move_idx].append(value_reached)
-                del move_state
-            avg_move_val = sum(all_move_values[move_idx]) / self.__iterations
-            move_expected_vals.append(avg_move_val)
+        max_moves = by_priority(moves) if budget is not None else moves
+        common_seed = GameRandom.getrandbits(32) if self.__dice_sampling == DiceSampling.COMMON else None
+        reused_values = self.__reusable_values(context, player, state)
+        continuations = {move.key(): {} for move in max_moves}  # move key -> continuation key -> rollout values
+        if self.__halving:
+            move_expected_vals = self.__successive_halving(max_moves, player, state, common_seed,
+                                                           reused_values, continuations, budget)
+        else:
+            move_expected_vals = self.__flat_values(max_moves, player, state, common_seed,
+                                                    reused_values, continuations, budget)
 
         # generate list of all moves tied for best move #
         max_val = max(move_expected_vals)
@@ -277,24 +517,704 @@ class MonteCarloAgent(Agent):
             if move_expected_vals[m_i] == max_val:
                 best_moves.append(m)
 
-        self.__curr_depth += 1
         if len(best_moves) == 1:    # shortcut to save time
-            return best_moves[0]
+            move = best_moves[0]
+        else:
+            move = self.__harry.choose(best_moves, player, state)
+
+        # the rollouts continuing after move are still valid if it plays out the same for real
+        deterministic = move.get_type() in (Moves.MoveType.BUILD, Moves.MoveType.TRADE) or \
+            (move.get_type() == Moves.MoveType.USE_DEV and move.uses() != Consts.DevType.KNIGHT)
+        turn_search = (player.get_id(), state.num_moves_played(), move.key(), continuations[move.key()])
+        context.set(self, MonteCarloAgent.TURN_SEARCH,
+                    turn_search if self.__reuse_turn_search and deterministic else None)
+        return move
+
+    def __reusable_values(self, context: AgentContext, player: Player,
+                          state: GameSession) -> Dict[Tuple, List[float]]:
+        # rollout values (by move key) left by the last choice, if the move it chose was just played
+        turn_search = context.get(self, MonteCarloAgent.TURN_SEARCH)
+        if turn_search is None:
+            return {}
+        player_id, num_moves_played, move_key, continuations = turn_search
+        context.set(self, MonteCarloAgent.TURN_SEARCH, None)
+        if (player.get_id() != player_id or state.num_moves_played() != num_moves_played + 1 or
+                state.move_history(1) != [move_key]):
+            return {}
+        return continuations
+
+    def __rollout_values(self, move: Moves.Move, player: Player, state: GameSession, num_rollouts: int,
+                         first_rollout: int, common_seed: Union[int, None],
+                         continuations: Dict[Tuple, List[float]], budget: Budget = None) -> List[float]:
+        # values of the rollouts first_rollout, first_rollout + 1, ... of move, their dice sampled as configured.
+        # the values are also added to continuations by the key of the move my turn continued with in the rollout.
+        # stops early (after one rollout at least) once budget is spent
+        if num_rollouts <= 0:
+            return []
+        if self.__dice_sampling == DiceSampling.STRATIFIED:
+            num_rolls = self.__depth * len(state.players()) + 1  # the most a rollout can roll
+            rollouts_dice_sums = list(zip(*(Dice.stratified_sums(num_rollouts) for _ in range(num_rolls))))
         else:
-            return self.__harry.choose(best_moves, player, state)
+            rollouts_dice_sums = [()] * num_rollouts
+
+        values = []
+        for rollout_idx, dice_sums in enumerate(rollouts_dice_sums, first_rollout):
+            if budget is not None and values and budget.expired():
+                break
+            if common_seed is None:
+                value, continuation = self.__rollout_value(move, player, state, dice_sums)
+            else:
+                rand_state = GameRandom.getstate()
+                GameRandom.seed(common_seed + rollout_idx)
+                value, continuation = self.__rollout_value(move, player, state, dice_sums)
+                GameRandom.setstate(rand_state)
+            values.append(value)
+            if continuation is not None:
+                continuations.setdefault(continuation.key(), []).append(value)
+            if budget is not None:
+                budget.spend()
+        return values
+
+    def __rollout_value(self, move: Moves.Move, player: Player, state: GameSession,
+                        dice_sums: Tuple = ()) -> Tuple[float, Union[Moves.Move, None]]:
+        # simulates move until end of my turn (and depth more rounds), returns final state evaluation
+        # and the move my turn continued with (None if it didn't)
+        move_state = deepcopy(state)
+        move_state.force_dice(*dice_sums)
+        move_state.simulate_game(move)
+        continuation = self.__playout(move_state, player)
+        return self.__h.value(move_state, player), continuation
+
+    def __playout(self, session: GameSession, my_player: Player) -> Union[Moves.Move, None]:
+        # plays the rest of my turn, then depth rounds of my turn and the opponents' (as sim_me and sim_opps do),
+        # or until the playout is truncated. returns the first move played if it continued my turn
+        continuation = None
+        num_plies = num_turns = 0
+        for my_segment in [True] + [True, False] * self.__depth:
+            while (session.current_player() == my_player) == my_segment and session.num_possible_moves():
+                if self.__truncated(session, num_plies, num_turns):
+                    return continuation
+                curr_player = session.current_player()
+                move = self.__sim_move(session, my_player)
+                if num_plies == 0 and my_segment:
+                    continuation = move
+                num_plies += 1
+                if session.current_player() != curr_player:
+                    num_turns += 1
+        return continuation
+
+    def __truncated(self, session: GameSession, num_plies: int, num_turns: int) -> bool:
+        if ((self.__max_plies is not None and num_plies >= self.__max_plies) or
+                (self.__max_turns is not None and num_turns >= self.__max_turns)):
+            return True
+        if self.__cutoff_vp_lead is None:
+            return False
+        # adaptive cutoff, once the outcome is clear
+        vps = sorted(p.vp() for p in session.players())
+        return session.is_game_over() or vps[-1] - vps[-2] >= self.__cutoff_vp_lead
+
+    def __sim_move(self, session: GameSession, my_player: Player) -> Union[Moves.Move, None]:
+        # :returns the move simulated if it was mine
+        if session.current_player() == my_player:
+            move_played = self.__rollout_agent.choose(session.possible_moves(), session.current_player(), session)
+            session.simulate_game(move_played, lazy=True)
+            return move_played
+        elif self.__fast_forward_opps and session.can_fast_forward():
+            session.fast_forward_turn()
+        else:
+            move_played = session.possible_move_at(*self.__randy.sample(session.possible_move_counts(),
+                                                                        session.current_player()))
+            session.simulate_game(move_played, lazy=True)
+
+    def __flat_values(self, moves: List[Moves.Move], player: Player, state: GameSession,
+                      common_seed: Union[int, None], reused_values: Dict[Tuple, List[float]],
+                      continuations: Dict[Tuple, Dict[Tuple, List[float]]], budget: Union[Budget, None]) -> List[float]:
+        # mean value of iters rollouts of every move (reused rollouts included). under a budget, the rollouts are
+        # spent in rounds over all the moves (of 1, 1, 2, 4... rollouts each) until it's spent, the moves that got
+        # no rollouts by then get -inf
+        move_values = [list(reused_values.get(move.key(), ())) for move in moves]
+        round_size = self.__iterations if budget is None else 1
+        rollouts_so_far = 0
+        while rollouts_so_far < self.__iterations:
+            rollouts_so_far = min(self.__iterations, rollouts_so_far + round_size)
+            for move, values in zip(moves, move_values):
+                if MonteCarloAgent.__spent(budget, move_values):
+                    return MonteCarloAgent.__mean_values(move_values)
+                values.extend(self.__rollout_values(move, player, state, rollouts_so_far - len(values), len(values),
+                                                    common_seed, continuations[move.key()], budget))
+            round_size = rollouts_so_far
+        return MonteCarloAgent.__mean_values(move_values)
+
+    def __successive_halving(self, moves: List[Moves.Move], player: Player, state: GameSession,
+                             common_seed: Union[int, None], reused_values: Dict[Tuple, List[float]],
+                             continuations: Dict[Tuple, Dict[Tuple, List[float]]],
+                             budget: Union[Budget, None]) -> List[float]:
+        # mean rollout value of the moves that survived all rounds, -inf for the dropped ones.
+        # reused rollouts count towards the rollouts of their move in the rounds, and are taken off the rollouts
+        # to allocate. once the budget (if any) is spent, the current survivors are compared as they are
+        move_values = [list(reused_values.get(move.key(), ())) for move in moves]
+        survivors = list(range(len(moves)))
+        rollouts_left = self.__iterations * len(moves) - sum(len(values) for values in move_values)
+        rounds_left = ceil(log2(len(moves)))
+        rollouts_so_far = 0
+        while rounds_left > 0 and rollouts_left >= len(survivors):
+            rollouts_so_far += max(1, rollouts_left // rounds_left // len(survivors))
+            for move_idx in survivors:
+                if MonteCarloAgent.__spent(budget, move_values):
+                    break
+                move_key = moves[move_idx].key()
+                new_values = self.__rollout_values(moves[move_idx], player, state,
+                                                   rollouts_so_far - len(move_values[move_idx]),
+                                                   len(move_values[move_idx]), common_seed, continuations[move_key],
+                                                   budget)
+                move_values[move_idx].extend(new_values)
+                rollouts_left -= len(new_values)
+            if MonteCarloAgent.__spent(budget, move_values):
+                break
+            rounds_left -= 1
+
+            survivors.sort(key=lambda i: sum(move_values[i]) / len(move_values[i]), reverse=True)
+            survivors = survivors[:ceil(len(survivors) / 2)]
+
+        survivor_values = MonteCarloAgent.__mean_values(move_values)
+        return [survivor_values[i] if i in survivors else -float('inf') for i in range(len(moves))]
+
+    @staticmethod
+    def __spent(budget: Union[Budget, None], move_values: List[List[float]]) -> bool:
+        # True once the budget is spent, if a move has rollouts to compare by
+        return budget is not None and budget.expired() and any(move_values)
+
+    @staticmethod
+    def __mean_values(move_values: List[List[float]]) -> List[float]:
+        return [sum(values) / len(values) if values else -float('inf') for values in move_values]
 
     def sim_me(self, session, my_player):
-        while session.current_player() == my_player and session.possible_moves():
-            session.simulate_game(self.__harry.choose(session.possible_moves(),
-                                                      session.current_player(),
-                                                      session))
+        while session.current_player() == my_player and session.num_possible_moves():
+            self.__sim_move(session, my_player)
 
     def sim_opps(self, session, my_player):
-        while session.current_player() != my_player and session.possible_moves():
-            move_played = self.__randy.choose(session.possible_moves(),
-                                              session.current_player(),
-                                              session)
-            session.simulate_game(move_played)
+        while session.current_player() != my_player and session.num_possible_moves():
+            self.__sim_move(session, my_player)
+
+
+class UCTNode:
+    """A node of an (open loop) UCT search tree, reached from its parent by playing a move. The node stands for
+    every state that the moves from the root can lead to, over dice rolls, hidden draws and determinizations"""
+    def __init__(self, player_id: int = None):
+        self.__player_id = player_id  # the player who played the move into this node (None for the root)
+        self.__visits = 0
+        self.__availability = 0
+        self.__total_value = 0.0
+        self.__children = {}
+
+    def visits(self) -> int:
+        """:returns the number of search iterations that went through this node"""
+        return self.__visits
+
+    def availability(self) -> int:
+        """:returns the number of search iterations in which this node's move could be played at its parent
+        (counted by searches over determinizations only, see mark_available)"""
+        return self.__availability
+
+    def mark_available(self) -> None:
+        """counts a search iteration in which this node's move could be played at its parent"""
+        self.__availability += 1
+
+    def mean_value(self) -> float:
+        """:returns the mean reward of the player who played the move into this node"""
+        return self.__total_value / self.__visits if self.__visits else 0.0
+
+    def total_value(self) -> float:
+        """:returns the total reward of the player who played the move into this node"""
+        return self.__total_value
+
+    def children_stats(self) -> Dict[Tuple, Tuple[int, float]]:
+        """:returns the visits and total value of every child, by the key of its move"""
+        return {move_key: (child.visits(), child.total_value()) for move_key, child in self.__children.items()}
+
+    def child(self, move_key: Tuple) -> Union[UCTNode, None]:
+        """:returns the child reached by playing the move with move_key (see Move.key), None if unexplored"""
+        return self.__children.get(move_key)
+
+    def add_child(self, move_key: Tuple, player_id: int) -> UCTNode:
+        """adds and :returns the child reached by player_id playing the move with move_key"""
+        child = UCTNode(player_id)
+        self.__children[move_key] = child
+        return child
+
+    def ucb(self, parent_visits: int, exploration: float, min_value: float, max_value: float) -> float:
+        """:returns the UCB1 score of this node as a choice of its parent, its mean value scaled to [0, 1] by
+        the range of mean values of its siblings"""
+        value_range = max_value - min_value
+        scaled_value = (self.mean_value() - min_value) / value_range if value_range else 0.5
+        return scaled_value + exploration * sqrt(log(parent_visits) / self.__visits)
+
+    def update(self, rewards: Dict[int, float]) -> None:
+        """backpropagates the rewards (by player id) of one search iteration through this node"""
+        self.__visits += 1
+        if self.__player_id is not None:
+            self.__total_value += rewards[self.__player_id]
+
+
+class UCTAgent(Agent):
+    """An agent that uses UCT Monte Carlo tree search: UCB1 selection over the moves of the simulated states,
+    expansion of one move per iteration, cheap (random) rollouts to the end of the turn and backpropagation of the
+    heuristic value of every player. Searches for a budget of iterations and/or seconds per decision, the subtree
+    of the moves played since the last decision is reused by the next one.
+    With determinizations, the search doesn't see the opponents' hidden cards: it iterates over a few copies of the
+    state with the hidden cards resampled consistently with the public card events (every opponent keeps what it's
+    known to hold and gets no more than it may hold, see GameSession.determinize), in turns, all in the same tree
+    (information set MCTS), so a move's UCB score counts only the iterations in which it could be played.
+    With workers, the root is searched in parallel by every worker (with its own tree) and their root statistics
+    are merged"""
+    EXPLORATION = sqrt(2)
+    DEFAULT_ITERATIONS = 200
+    ROLLOUT_TURNS = 1  # rollouts end after this many turn changes (1 = at the end of the current turn)
+    SEARCH_TREE = 'search_tree'  # (root of the last search, num_moves_played() of the session it searched)
+
+    def __init__(self, heuristic, iters: int = None, time_limit: float = None,
+                 rollout_turns: int = ROLLOUT_TURNS, exploration: float = EXPLORATION, num_workers: int = 0,
+                 determinizations: int = 0):
+        """iters / time_limit (seconds) bound every decision's search, iters defaults to DEFAULT_ITERATIONS
+        if neither is given. num_workers > 0 splits the iterations between that many worker processes, and every
+        one of them searches for the whole time limit. determinizations > 0 searches that many determinized copies
+        of the state (sharing the iterations and the tree) instead of the state itself, so the search uses no more
+        than the decision maker sees"""
+        super().__init__(AgentType.UCT)
+        self.__h = heuristic
+        self.__iterations = iters if iters is not None or time_limit is not None else UCTAgent.DEFAULT_ITERATIONS
+        self.__time_limit = time_limit
+        self.__rollout_turns = rollout_turns
+        self.__exploration = exploration
+        self.__determinizations = determinizations
+        self.__randy = RandomAgent()
+        self.__simulated = False
+        self.__workers = ParallelSearch.RootParallelSearch(self, num_workers) if num_workers else None
+
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession,
+               budget: Budget = None) -> Moves.Move:
+        decided_move, moves = self.pre_decision(moves, state)
+        if decided_move is not None:
+            return decided_move
+        context = player.agent_context()
+        if self.__workers is not None:
+            # the workers can't share the budget, they get its simulations and time left
+            num_iters, time_limit = self.__iterations, None
+            if budget is not None:
+                if budget.simulations_left() is not None:
+                    num_iters = min(num_iters if num_iters is not None else budget.simulations_left(),
+                                    budget.simulations_left())
+                time_limit = budget.time_left()
+            root_stats = self.__workers.search(state, context, num_iters, time_limit)
+        else:
+            root_stats = self.search(state, context, budget=budget)
+
+        def visits(move: Moves.Move) -> Tuple[int, float]:
+            move_visits, total_value = root_stats.get(move.key(), (0, 0.0))
+            return move_visits, total_value / move_visits if move_visits else 0.0
+
+        return max(moves, key=visits)
+
+    def search(self, state: GameSession, context: AgentContext, num_iters: int = None,
+               budget: Budget = None) -> ParallelSearch.RootStats:
+        """searches from state for num_iters iterations (by default the agent's iterations) and/or the agent's
+        time limit, or until budget is spent (one iteration at least, each a simulation), continuing the tree of
+        the last search kept in context. :returns the visits and total value of every move searched at the root,
+        by move key"""
+        num_iters = num_iters if num_iters is not None else self.__iterations
+        root = self.__reusable_root(context, state)
+        deadline = time.time() + self.__time_limit if self.__time_limit is not None else None
+        root_states = self.__determinized(state) if self.__determinizations else [state]
+        iters_done = 0
+        while ((num_iters is None or iters_done < num_iters) and (deadline is None or time.time() < deadline) and
+               not (budget is not None and iters_done and budget.expired())):
+            self.__search(root, root_states[iters_done % len(root_states)])
+            iters_done += 1
+            if budget is not None:
+                budget.spend()
+
+        context.set(self, UCTAgent.SEARCH_TREE, (root, state.num_moves_played()))
+        return root.children_stats()
+
+    def close(self) -> None:
+        """shuts down the worker processes searching in parallel, if any"""
+        if self.__workers is not None:
+            self.__workers.close()
+
+    def game_over(self, player: Player) -> None:
+        # the workers drop their trees of the seat
+        if self.__workers is not None:
+            self.__workers.release(player.agent_context())
+
+    def samples_moves(self) -> bool:
+        # copies of the agent inside simulated game states play randomly
+        return self.__simulated
+
+    def sample(self, move_counts: Dict[Tuple[Moves.MoveType, GameSession.MoveSubtype], int],
+               player: Player) -> Tuple[Moves.MoveType, GameSession.MoveSubtype, int]:
+        return self.__randy.sample(move_counts, player)
+
+    def __determinized(self, state: GameSession) -> List[GameSession]:
+        # copies of state with what its decision maker can't see resampled, every one of them could be the game
+        # as far as it knows
+        me = state.possible_moves()[0].player()
+        root_states = []
+        for _ in range(self.__determinizations):
+            root_state = deepcopy(state)
+            root_state.determinize(me)
+            root_states.append(root_state)
+        return root_states
+
+    def __reusable_root(self, context: AgentContext, state: GameSession) -> UCTNode:
+        # follow the moves played since the last search down its tree
+        last_root, last_num_moves = context.get(self, UCTAgent.SEARCH_TREE, (None, 0))
+        num_moves_since = state.num_moves_played() - last_num_moves
+        history = state.move_history(num_moves_since) if last_root and num_moves_since >= 0 else None
+        node = last_root
+        for move_key in history or ():
+            node = node.child(move_key)
+            if node is None:
+                break
+        return node if history is not None and node is not None else UCTNode()
+
+    def __search(self, root: UCTNode, root_state: GameSession) -> None:
+        state = deepcopy(root_state)
+        node = root
+        path = [root]
+        moves = state.possible_moves()
+        while moves:
+            moves_by_key = {move.key(): move for move in moves}
+            unexplored = [move_key for move_key in moves_by_key if node.child(move_key) is None]
+            if unexplored:  # expand
+                move = moves_by_key[choice(unexplored)]
+                node = node.add_child(move.key(), move.player().get_id())
+                path.append(node)
+                state.simulate_game(move, lazy=True)
+                self.__rollout(state)
+                break
+
+            parent = node
+            values = [parent.child(move_key).mean_value() for move_key in moves_by_key]
+            min_val, max_val = min(values), max(values)
+            if self.__determinizations:
+                for move_key in moves_by_key:
+                    parent.child(move_key).mark_available()
+
+            def ucb(move_key: Tuple) -> float:
+                child = parent.child(move_key)
+                parent_visits = child.availability() if self.__determinizations else parent.visits()
+                return child.ucb(parent_visits, self.__exploration, min_val, max_val)
+            move_key = max(moves_by_key, key=ucb)
+            node = node.child(move_key)
+            path.append(node)
+            moves = state.simulate_game(moves_by_key[move_key])
+
+        rewards = self.__rewards(state)
+        for node in path:
+            node.update(rewards)
+
+    def __rollout(self, state: GameSession) -> None:
+        turns_left = self.__rollout_turns
+        curr_player = state.current_player()
+        while turns_left > 0 and not state.is_game_over() and state.num_possible_moves():
+            move = state.possible_move_at(*self.__randy.sample(state.possible_move_counts(), curr_player))
+            state.simulate_game(move, lazy=True)
+            if state.current_player() != curr_player:
+                turns_left -= 1
+                curr_player = state.current_player()
+
+    def __rewards(self, state: GameSession) -> Dict[int, float]:
+        # UCB scales the values it compares (see UCTNode.ucb), so the heuristic's own scale doesn't matter
+        return {p.get_id(): self.__h.value(state, p) for p in state.players()}
+
+    def __getstate__(self):
+        # copies inside game states play randomly (see samples_moves)
+        state = self.__dict__.copy()
+        state['_UCTAgent__simulated'] = True
+        return state
+
+
+class _BudgetSpent(Exception):
+    """aborts a search once its budget is spent"""
+
+
+class _ExpectimaxSearch:
+    """One search of an ExpectimaxAgent: the player searching, the bounds its leaf values are clipped to and the
+    budget every state copied counts against"""
+    def __init__(self, me: Player, bounds: Tuple[float, float], budget: Union[Budget, None]):
+        self.__me = me
+        self.__bounds = bounds
+        self.__budget = budget
+
+    def me(self) -> Player:
+        """:returns the player searching"""
+        return self.__me
+
+    def bounds(self) -> Tuple[float, float]:
+        """:returns the (lower, upper) bounds the leaf values are clipped to"""
+        return self.__bounds
+
+    def budget(self) -> Union[Budget, None]:
+        """:returns the budget of the search, None if unlimited"""
+        return self.__budget
+
+
+class ExpectimaxAgent(Agent):
+    """An agent that searches the rest of its turn (and the next turns, up to a horizon) exhaustively: max nodes
+    over its own moves of the turn, chance nodes over the dice sums of every turn change (weighted by their
+    probabilities) and over the cards a dev purchase or a robber steal draws, and an opponent model (an agent) that
+    plays every other decision.
+    Leaf values are clipped to a window around the value of the root, so chance nodes are cut off as soon as their
+    outcomes left can't matter (Star1), or once probing their outcomes bounds them from below (Star2). Moves are
+    searched in a cheap priority order (see by_priority), so good bounds are found early.
+    Under a budget, the searches deepen (in plies of the agent's turn) until it's spent"""
+    TURNS = 1  # the search ends after this many turn changes (1 = at the end of the current turn)
+    MAX_PLIES = 2  # main phase moves searched per turn, the agent passes after these
+    OPP_MAX_PLIES = 8  # main phase moves the opponent model plays per turn, it passes after these
+    VALUE_WINDOW = 10.0
+
+    def __init__(self, heuristic, turns: int = TURNS, max_plies: int = MAX_PLIES, opponent_agent: Agent = None,
+                 value_window: Union[float, None] = VALUE_WINDOW):
+        """turns is the search horizon, in turn changes. the agent searches max_plies main phase moves of its turn
+        (and passes after them). opponent_agent plays the opponents' decisions in the search, and the agent's own
+        ones after its turn (a RuleBasedAgent by default). value_window clips the leaf values to the root value
+        +- value_window, None leaves them unbounded (and the chance nodes uncut)"""
+        super().__init__(AgentType.EXPECTIMAX)
+        self.__h = heuristic
+        self.__turns = turns
+        self.__max_plies = max_plies
+        self.__opponent_agent = opponent_agent if opponent_agent is not None else RuleBasedAgent()
+        self.__value_window = value_window
+        self.__randy = RandomAgent()
+        self.__simulated = False
+
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession,
+               budget: Budget = None) -> Moves.Move:
+        decided_move, moves = self.pre_decision(moves, state)
+        if decided_move is not None:
+            return decided_move
+        lower, upper = -float('inf'), float('inf')
+        if self.__value_window is not None:
+            root_value = self.__h.value(state, player)
+            lower, upper = root_value - self.__value_window, root_value + self.__value_window
+        search = _ExpectimaxSearch(player, (lower, upper), budget)
+
+        # without a budget only the full depth is searched, with one every depth is, until the budget is spent
+        best_move = depth_best_move = None
+        try:
+            for max_plies in range(1 if budget is not None else self.__max_plies, self.__max_plies + 1):
+                depth_best_move, best_value = None, -float('inf')
+                for move in by_priority(moves):
+                    value = self.__move_value(state, move, search, self.__turns, max_plies - 1, 0,
+                                              max(lower, best_value), upper)
+                    if depth_best_move is None or value > best_value:
+                        depth_best_move, best_value = move, value
+                best_move = depth_best_move
+        except _BudgetSpent:
+            if best_move is None:  # not even the first depth was searched, its best move so far
+                best_move = depth_best_move if depth_best_move is not None else by_priority(moves)[0]
+        return best_move
+
+    def samples_moves(self) -> bool:
+        # copies of the agent inside simulated game states play randomly
+        return self.__simulated
+
+    def sample(self, move_counts: Dict[Tuple[Moves.MoveType, GameSession.MoveSubtype], int],
+               player: Player) -> Tuple[Moves.MoveType, GameSession.MoveSubtype, int]:
+        return self.__randy.sample(move_counts, player)
+
+    def __node_value(self, state: GameSession, search: _ExpectimaxSearch, turns_left: int, plies_left: int,
+                     turn_plies: int, alpha: float, beta: float, probe: bool = False) -> float:
+        # value of the decision pending in state. a probe searches only the first move of a max node
+        moves = state.possible_moves() if not state.is_game_over() else []
+        if not moves:
+            return self.__leaf_value(state, search)
+
+        pass_move = next((move for move in moves if move.get_type() == Moves.MoveType.PASS), None)
+        if self.__is_max_node(moves, search, turns_left, plies_left):
+            next_plies_left = plies_left - 1 if pass_move is not None else plies_left
+            best_value = -float('inf')
+            for move in by_priority(moves):
+                best_value = max(best_value, self.__move_value(state, move, search, turns_left, next_plies_left,
+                                                               turn_plies, max(alpha, best_value), beta))
+                if best_value >= beta or probe:
+                    break
+            return best_value
+
+        if pass_move is not None and (moves[0].player() == search.me() and turns_left == self.__turns or
+                                      turn_plies >= ExpectimaxAgent.OPP_MAX_PLIES):
+            move = pass_move  # the agent's plies of its turn are used up, or the opponent model's
+        else:
+            move = self.__opponent_agent.choose(moves, moves[0].player(), state)
+        return self.__move_value(state, move, search, turns_left, plies_left,
+                                 turn_plies + 1 if pass_move is not None else turn_plies, alpha, beta)
+
+    def __is_max_node(self, moves: List[Moves.Move], search: _ExpectimaxSearch, turns_left: int,
+                      plies_left: int) -> bool:
+        # the agent's own decisions of the searched turn, but main phase ones only while it has plies left
+        if moves[0].player() != search.me() or turns_left != self.__turns:
+            return False
+        return plies_left > 0 or all(move.get_type() != Moves.MoveType.PASS for move in moves)
+
+    def __move_value(self, state: GameSession, move: Moves.Move, search: _ExpectimaxSearch, turns_left: int,
+                     plies_left: int, turn_plies: int, alpha: float, beta: float) -> float:
+        if move.get_type() == Moves.MoveType.PASS:
+            if turns_left == 1:  # the horizon, the state is evaluated as it is before the next roll
+                return self.__leaf_value(state, search)
+            outcomes = [(prob, (dice_sum,), ()) for dice_sum, prob in Dice.PROBABILITIES.items() if prob]
+            outcomes.sort(key=lambda outcome: outcome[0], reverse=True)  # so less probability is left to cut off
+        else:
+            outcomes = [(prob, (), (card,)) for card, prob in state.draw_outcomes(move)] or [(1, (), ())]
+        return self.__chance_value(state, move, outcomes, search, turns_left, plies_left, turn_plies, alpha, beta)
+
+    def __after_move_value(self, state: GameSession, child: GameSession, search: _ExpectimaxSearch, turns_left: int,
+                           plies_left: int, turn_plies: int, alpha: float, beta: float) -> float:
+        # value of child, a state after a move in state. the move ended the turn if the current player changed
+        if child.current_player() != state.current_player():
+            turns_left, turn_plies = turns_left - 1, 0
+            if turns_left == 0:
+                return self.__leaf_value(child, search)
+        return self.__node_value(child, search, turns_left, plies_left, turn_plies, alpha, beta)
+
+    def __chance_value(self, state: GameSession, move: Moves.Move, outcomes: List[Tuple[float, Tuple, Tuple]],
+                       search: _ExpectimaxSearch, turns_left: int, plies_left: int, turn_plies: int,
+                       alpha: float, beta: float) -> float:
+        # expected value of playing move in state, over outcomes of (probability, dice sums, cards drawn).
+        # returns an upper bound <= alpha or a lower bound >= beta if cut off
+        lower, upper = search.bounds()
+        budget = search.budget()
+        children = [None] * len(outcomes)  # outcome states, made when first needed
+
+        def child_state(i: int) -> GameSession:
+            if children[i] is None:
+                if budget is not None:
+                    if budget.expired():
+                        raise _BudgetSpent()
+                    budget.spend()
+                _, dice_sums, cards = outcomes[i]
+                children[i] = deepcopy(state)
+                children[i].force_dice(*dice_sums)
+                children[i].force_draws(*cards)
+                children[i].simulate_game(move, lazy=True)
+            return children[i]
+
+        # Star2: a probe of every max node outcome (its first move only) bounds the outcome from below
+        lower_bounds = [lower] * len(outcomes)
+        if len(outcomes) > 1 and beta < upper:
+            for i in range(len(outcomes)):
+                child = child_state(i)
+                if child.current_player() == state.current_player() and not child.is_game_over() and \
+                        self.__is_max_node(child.possible_moves(), search, turns_left, plies_left):
+                    lower_bounds[i] = self.__node_value(child, search, turns_left, plies_left, turn_plies,
+                                                        lower, upper, probe=True)
+            probed_value = sum(prob * bound for (prob, _, _), bound in zip(outcomes, lower_bounds))
+            if probed_value >= beta:
+                return probed_value
+
+        # Star1: cut off once the outcomes left can't bring the expected value into (alpha, beta)
+        expected_value = 0.0
+        prob_left = 1.0
+        lower_left = sum(prob * bound for (prob, _, _), bound in zip(outcomes, lower_bounds))
+        for i, ((prob, _, _), bound) in enumerate(zip(outcomes, lower_bounds)):
+            prob_left -= prob
+            lower_left -= prob * bound
+            child_alpha = (alpha - expected_value - prob_left * upper) / prob
+            child_beta = (beta - expected_value - lower_left) / prob
+            expected_value += prob * self.__after_move_value(state, child_state(i), search, turns_left, plies_left,
+                                                             turn_plies, max(child_alpha, lower),
+                                                             min(child_beta, upper))
+            if expected_value + prob_left * upper <= alpha:
+                return expected_value + prob_left * upper
+            if expected_value + lower_left >= beta:
+                return expected_value + lower_left
+        return expected_value
+
+    def __leaf_value(self, state: GameSession, search: _ExpectimaxSearch) -> float:
+        lower, upper = search.bounds()
+        return min(max(self.__h.value(state, search.me()), lower), upper)
+
+    def __getstate__(self):
+        # copies inside game states play randomly (see samples_moves)
+        state = self.__dict__.copy()
+        state['_ExpectimaxAgent__simulated'] = True
+        return state
+
+
+class TurnPlanningAgent(Agent):
+    """An agent that plans the rest of its turn at once (see TurnPlanner): every end-of-turn outcome of the trades
+    and purchases it can make is played out on a copy and valued by the heuristic (one value per outcome), and the
+    moves of the best one are played one by one before passing. A dev card is played first if it raises the value
+    of the state. Decisions outside the main phase are played as a OneMoveHeuristicAgent plays them.
+    Under a budget, the plans with the most purchases are valued first"""
+    PLAN = 'plan'  # (player id, # moves played, moves left to play) of the plan being played
+
+    def __init__(self, heuristic):
+        super().__init__(AgentType.TURN_PLANNING)
+        self.__h = heuristic
+        self.__harry = OneMoveHeuristicAgent(heuristic)
+
+    def choose(self, moves: List[Moves.Move], player: Player, state: GameSession,
+               budget: Budget = None) -> Moves.Move:
+        pass_move = next((move for move in moves if move.get_type() == Moves.MoveType.PASS), None)
+        if pass_move is None:  # not a main phase decision
+            return self.__harry.choose(moves, player, state, budget)
+        context = player.agent_context()
+        decided_move, moves = self.pre_decision(moves, state)
+        if decided_move is not None:
+            context.set(self, TurnPlanningAgent.PLAN, None)
+            return decided_move
+
+        player = find_sim_player(state, moves[0].player())
+        planned_move = self.__next_planned_move(context, moves, player, state)
+        if planned_move is not None:
+            return planned_move
+
+        root_value = self.__h.value(state, player)
+        dev_moves = [move for move in moves if move.get_type() == Moves.MoveType.USE_DEV]
+        if dev_moves:
+            dev_values = [self.__harry.move_value(state, move) for move in dev_moves]
+            if max(dev_values) > root_value:
+                return dev_moves[dev_values.index(max(dev_values))]
+
+        best_value, best_moves = root_value, []
+        plans = sorted(TurnPlanner.plan_turn(state), key=lambda plan: plan.num_purchases(), reverse=True)
+        for plan in plans:
+            if budget is not None and budget.expired():
+                break
+            if plan.num_purchases() == 0:  # the root, valued already
+                continue
+            played = TurnPlanner.play_plan(state, plan)
+            if budget is not None:
+                budget.spend()
+            if played is None:
+                continue
+            plan_state, plan_moves = played
+            value = self.__h.value(plan_state, find_sim_player(plan_state, player))
+            if value > best_value:
+                best_value, best_moves = value, plan_moves
+
+        if not best_moves:
+            context.set(self, TurnPlanningAgent.PLAN, None)
+            return pass_move
+        context.set(self, TurnPlanningAgent.PLAN, (player.get_id(), state.num_moves_played() + 1, best_moves[1:]))
+        return next(move for move in moves if move.key() == best_moves[0].key())
+
+    def __next_planned_move(self, context: AgentContext, moves: List[Moves.Move], player: Player,
+                            state: GameSession) -> Union[Moves.Move, None]:
+        # the next move of the plan being played, if this decision continues it (the pass once it's all played)
+        plan = context.get(self, TurnPlanningAgent.PLAN)
+        if plan is None:
+            return None
+        player_id, num_moves_played, moves_left = plan
+        context.set(self, TurnPlanningAgent.PLAN, None)
+        if player_id != player.get_id() or num_moves_played != state.num_moves_played():
+            return None
+        if not moves_left:
+            return next(move for move in moves if move.get_type() == Moves.MoveType.PASS)
+        move = next((move for move in moves if move.key() == moves_left[0].key()), None)
+        if move is not None:
+            context.set(self, TurnPlanningAgent.PLAN, (player_id, num_moves_played + 1, moves_left[1:]))
+        return move
 
 
 # class DQNAgent(Agent):
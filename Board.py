@@ -1,7 +1,7 @@
 from __future__ import annotations
 import hexgrid
 import GameConstants as Consts
-from random import shuffle
+from GameRandom import shuffle
 from typing import List, Dict
 import HexTile
 import Player
@@ -9,6 +9,11 @@ import Hand
 import Buildable
 from Dice import PROBABILITIES
 
+# the board layout is fixed, while hexgrid recomputes these on every call
+LEGAL_NODES = frozenset(hexgrid.legal_node_coords())
+LEGAL_EDGES = frozenset(hexgrid.legal_edge_coords())
+LEGAL_TILES = frozenset(hexgrid.legal_tile_coords())
+
 
 class Board:
     COLORS = {
@@ -103,7 +108,7 @@ class Board:
             locs = [location - 0x11, location + 0x11, location + 0xf]
         else:
             locs = [location - 0x11, location + 0x11, location - 0xf]
-        return [loc for loc in locs if loc in hexgrid.legal_node_coords()]
+        return [loc for loc in locs if loc in LEGAL_NODES]
 
     @staticmethod
     def get_adj_edges_to_node(location: int) -> List[int]:
@@ -111,17 +116,17 @@ class Board:
             locs = [location, location - 0x11, location - 0x1]
         else:
             locs = [location - 0x10, location - 0x11, location]
-        return [loc for loc in locs if loc in hexgrid.legal_edge_coords()]
+        return [loc for loc in locs if loc in LEGAL_EDGES]
 
     @staticmethod
     def get_adj_tile_ids_to_node(location: int) -> List[int]:
-        if location not in hexgrid.legal_node_coords():
+        if location not in LEGAL_NODES:
             raise ValueError(f'tried to access node {location}')
         if location % 2 == 0:
             tile_coords = [location - 0x1, location + 0x1, location - 0x21]
         else:
             tile_coords = [location + 0x10, location - 0x10, location - 0x12]
-        return [hexgrid.tile_id_from_coord(coord) - 1 for coord in tile_coords if coord in hexgrid.legal_tile_coords()]
+        return [hexgrid.tile_id_from_coord(coord) - 1 for coord in tile_coords if coord in LEGAL_TILES]
 
     def build(self, buildable: Buildable.Buildable) -> None:
         player = buildable.player()
@@ -243,9 +248,7 @@ class Board:
                 if not self.hexes()[hex_tile].has_robber():
                     rolls.add(self.hexes()[hex_tile].token())
 
-        prob = sum(PROBABILITIES.get(roll, 0) for roll in rolls)
-        assert 0 <= prob <= 1
-        return prob
+        return sum(PROBABILITIES.get(roll, 0) for roll in rolls)
 
     def expectation_score(self, player: Player) -> float:
         """
@@ -258,9 +261,7 @@ class Board:
         for city_loc in player.city_nodes():
             for hex_tile in self.get_adj_tile_ids_to_node(city_loc):
                 rolls_amounts.append((self.hexes()[hex_tile].token(), Consts.NUM_RESOURCES_PER_CITY))
-        expected = sum(PROBABILITIES.get(roll, 0) * num_resources for roll, num_resources in rolls_amounts)
-        assert expected >= 0
-        return expected
+        return sum(PROBABILITIES.get(roll, 0) * num_resources for roll, num_resources in rolls_amounts)
 
     def edges_map(self) -> str:
         def player_color(player):
@@ -0,0 +1,32 @@
+from typing import Union
+import time
+
+
+class Budget:
+    """The thinking budget of a single decision: a time limit and/or a number of simulations (rollouts, move
+    evaluations or search iterations, as the agent counts them). Agents that respect a budget keep a best-so-far
+    answer and stop improving it once the budget is spent"""
+    def __init__(self, seconds: float = None, simulations: int = None):
+        self.__deadline = time.time() + seconds if seconds is not None else None
+        self.__simulations_left = simulations
+
+    def spend(self, simulations: int = 1) -> None:
+        """counts simulations against the budget"""
+        if self.__simulations_left is not None:
+            self.__simulations_left -= simulations
+
+    def expired(self) -> bool:
+        """:returns True iff the time or the simulations of the budget are used up"""
+        return ((self.__deadline is not None and time.time() >= self.__deadline) or
+                (self.__simulations_left is not None and self.__simulations_left <= 0))
+
+    def time_left(self) -> Union[float, None]:
+        """:returns the seconds left until the deadline (None if the budget has no time limit)"""
+        return max(0.0, self.__deadline - time.time()) if self.__deadline is not None else None
+
+    def simulations_left(self) -> Union[int, None]:
+        """:returns the number of simulations left (None if the budget doesn't limit them)"""
+        return max(0, self.__simulations_left) if self.__simulations_left is not None else None
+
+    def __str__(self) -> str:
+        return f'[BUDGET] time left = {self.time_left()}, simulations left = {self.simulations_left()}'
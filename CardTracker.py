@@ -0,0 +1,98 @@
+from __future__ import annotations
+from typing import Dict, List, Tuple
+from collections import Counter
+import GameConstants as Consts
+import Hand
+import Player
+
+
+class CardTracker:
+    """Counts the cards of the game the way every player sees them, from the public events only: for every player
+    the least and the most of every resource it may hold (its hand size is public), and the dev cards nobody has
+    used yet. Every event updates the counts in constant time, so reading them is cheap too"""
+    def __init__(self, players: List[Player.Player]):
+        self.__min_counts = {player: Counter() for player in players}
+        self.__max_counts = {player: Counter() for player in players}
+        self.__unused_devs = Counter(Consts.DEV_COUNTS)  # the dev cards in the deck or in hidden hands
+
+    # events #
+    def gain(self, player: Player.Player, cards: Hand.Hand) -> None:
+        """player received cards everyone saw (production, trades, year of plenty, monopoly)"""
+        for card in cards:
+            self.__min_counts[player][card] += 1
+            self.__max_counts[player][card] += 1
+
+    def lose(self, player: Player.Player, cards: Hand.Hand) -> None:
+        """player gave cards everyone saw (builds, purchases, trades and discards)"""
+        for card in cards:
+            self.__min_counts[player][card] = max(0, self.__min_counts[player][card] - 1)
+            self.__max_counts[player][card] = max(0, self.__max_counts[player][card] - 1)
+
+    def lose_all(self, player: Player.Player, resource: Consts.ResourceType) -> None:
+        """player gave all its cards of resource (to a monopoly)"""
+        self.__min_counts[player][resource] = 0
+        self.__max_counts[player][resource] = 0
+
+    def steal(self, thief: Player.Player, victim: Player.Player) -> None:
+        """thief took a card only the two of them saw from victim, call before the card is moved"""
+        bounds = self.resource_bounds(victim)
+        possible = [resource for resource, (_, most) in bounds.items() if most > 0]
+        if len(possible) == 1:  # the victim holds one resource only, the card is known
+            self.lose(victim, Hand.Hand(*possible))
+            self.gain(thief, Hand.Hand(*possible))
+            return
+        for resource in possible:
+            self.__min_counts[victim][resource] = max(0, self.__min_counts[victim][resource] - 1)
+            self.__max_counts[thief][resource] += 1
+
+    def use_dev(self, dev_type: Consts.DevType) -> None:
+        """a player used a dev card of dev_type (buying one shows nothing but the hand size)"""
+        self.__unused_devs[dev_type] = max(0, self.__unused_devs[dev_type] - 1)
+
+    # counts #
+    def resource_bounds(self, player: Player.Player) -> Dict[Consts.ResourceType, Tuple[int, int]]:
+        """:returns the least and the most cards of every yielding resource player may hold, as everyone sees it"""
+        hand_size = player.resource_hand_size()
+        min_counts, max_counts = self.__min_counts[player], self.__max_counts[player]
+        min_total = sum(min_counts[resource] for resource in Consts.YIELDING_RESOURCES)
+        max_total = sum(max_counts[resource] for resource in Consts.YIELDING_RESOURCES)
+        bounds = {}
+        for resource in Consts.YIELDING_RESOURCES:
+            most = min(max_counts[resource], hand_size, hand_size - (min_total - min_counts[resource]))
+            least = max(min_counts[resource], hand_size - (max_total - max_counts[resource]))
+            bounds[resource] = (min(least, max(0, most)), max(0, most))
+        return bounds
+
+    def known_resources(self, player: Player.Player) -> Hand.Hand:
+        """:returns the cards everyone knows player holds"""
+        return Hand.Hand(*(resource for resource, (least, _) in self.resource_bounds(player).items()
+                           for _ in range(least)))
+
+    def resource_distribution(self, player: Player.Player) -> Dict[Consts.ResourceType, float]:
+        """:returns the probability of every yielding resource being a random card of player's, as everyone sees
+        it: its known cards, and the rest spread over the resources it may hold more of. empty if its hand is"""
+        hand_size = player.resource_hand_size()
+        if not hand_size:
+            return {}
+        bounds = self.resource_bounds(player)
+        num_unknown = hand_size - sum(least for least, _ in bounds.values())
+        slack = {resource: most - least for resource, (least, most) in bounds.items()}
+        total_slack = sum(slack.values())
+        distribution = {}
+        for resource, (least, _) in bounds.items():
+            expected = least + (num_unknown * slack[resource] / total_slack if total_slack else 0)
+            if expected > 0:
+                distribution[resource] = expected / hand_size
+        return distribution
+
+    def unseen_devs(self, observer: Player.Player) -> Hand.Hand:
+        """:returns the dev cards observer hasn't seen: the ones in the deck and in its opponents' hands"""
+        unseen = Counter(self.__unused_devs)
+        unseen.subtract(observer.dev_hand())
+        return Hand.Hand(*(dev_type for dev_type, count in unseen.items() for _ in range(max(0, count))))
+
+    def dev_distribution(self, observer: Player.Player) -> Dict[Consts.DevType, float]:
+        """:returns the probability of every dev type being the next dev card observer buys (or one it hasn't
+        seen), empty if it has seen them all"""
+        unseen = self.unseen_devs(observer)
+        return {dev_type: count / unseen.size() for dev_type, count in Counter(unseen).items()}
@@ -76,22 +76,24 @@ def session_to_input(session):
     for the neural network.
     """
     all_players = get_player_order(session)
-    hand_vec = get_hand_vec(all_players)
+    hand_vec = get_hand_vec(all_players, session.card_tracker())
     board = session.board()
     board_vec = get_board_vec(board, all_players)
     feature_vec = get_feature_vec(board, all_players)
     data = np.hstack([hand_vec, board_vec, feature_vec])
     return data
 
-def get_hand_vec(players):
+def get_hand_vec(players, tracker):
     """
-    Make a numpy vector based on the player's hands.
+    Make a numpy vector based on the player's hands (the other players' resources as
+    far as everyone knows them, see CardTracker).
     """
     hand_data = np.zeros(HAND_VEC_SIZE, np.uint8)
     # Resources Hand 20:
     for i, player in enumerate(players):
+        hand = player.resource_hand() if i == 0 else tracker.known_resources(player)
         for j, resc in enumerate(YIELDING_RESOURCES):
-            hand_data[i*5 + j] = len(player.resource_hand().cards_of_type(resc))
+            hand_data[i*5 + j] = len(hand.cards_of_type(resc))
     # Agent's (closed) dev card Hand: 5
     for i, dev in enumerate([DevType.KNIGHT, DevType.VP, DevType.MONOPOLY, DevType.YEAR_OF_PLENTY, DevType.ROAD_BUILDING]):
         hand_data[20+i] = len(players[0].dev_hand().cards_of_type(dev))
@@ -233,7 +235,7 @@ def open_prediction_tree(moves, originel_session):
             move_dict[move] = dev_dict
         if isinstance(move, UseKnightDevMove):
             res_dict = {}
-            percent_dict = get_knight_percents(move)
+            percent_dict = get_knight_percents(move, originel_session)
             if percent_dict == None:
                 sessions.append(deepcopy(originel_session))
                 res_dict = {len(sessions) - 1: 1}
@@ -257,36 +259,19 @@ def open_prediction_tree(moves, originel_session):
 
 def get_dev_percents(session):
     """
-    Returns a dict {percent: dev_card}
+    Returns a dict {dev_card: percent} of the dev cards the current player hasn't seen
     """
-    all_cards = deepcopy(DEV_COUNTS)
-    players = get_player_order(session)
-    # Remove the open cards of all the players
-    for player in players:
-        for used in player.used_dev_hand():
-            all_cards[used] -= 1
-    # Remove the closed card of the current player
-    for unused in player.dev_hand():
-            all_cards[unused] -= 1
-    cards_sum = sum(all_cards[i] for i in all_cards)
-    ret_dict = {}
-    for dev_type in [DevType.KNIGHT, DevType.VP, DevType.MONOPOLY, DevType.YEAR_OF_PLENTY, DevType.ROAD_BUILDING]:
-        ret_dict[dev_type] = all_cards[dev_type] / cards_sum
-    return ret_dict
-
-def get_knight_percents(knight_move):
+    return session.card_tracker().dev_distribution(get_player_order(session)[0])
+
+def get_knight_percents(knight_move, session):
     """
-    Returns a dict {percent: resource_card} or None if we don't take from any player
+    Returns a dict {resource_card: percent} or None if we don't take from any player
     """
     if knight_move.take_from() == None:
         return None
-    hand = knight_move.take_from().resource_hand()
-    if len(hand) == 0:
-        return None
-    percents = {}
-    for res_type in [ResourceType.FOREST, ResourceType.ORE, ResourceType.BRICK, ResourceType.SHEEP, ResourceType.WHEAT]:
-        percents[res_type] = len(hand.cards_of_type(res_type)) / len(hand)
-    return percents
+    victim = next(p for p in session.players() if p == knight_move.take_from())
+    percents = session.card_tracker().resource_distribution(victim)
+    return percents if percents else None
 
 def fix_rewards(predicts, win_status):
     """
@@ -1,5 +1,5 @@
-from typing import Tuple
-from random import randint
+from typing import Tuple, List
+from GameRandom import randint, random, shuffle
 
 PROBABILITIES = {
     0:  0,
@@ -17,18 +17,43 @@ PROBABILITIES = {
 }
 
 
+def stratified_sums(num_samples: int) -> List[int]:
+    """:returns num_samples dice sums spread over the sums in proportion to their probabilities (systematic
+    sampling, one sum per 1 / num_samples of probability from a random offset), in random order"""
+    targets = [(random() + i) / num_samples for i in range(num_samples)]
+    sums = []
+    cumulative_prob = 0
+    for dice_sum in range(2, 13):
+        cumulative_prob += PROBABILITIES[dice_sum]
+        while len(sums) < num_samples and targets[len(sums)] < cumulative_prob:
+            sums.append(dice_sum)
+    sums.extend([12] * (num_samples - len(sums)))  # float round off
+    shuffle(sums)
+    return sums
+
+
 class Dice:
     """Class representing a fair pair of dice"""
     def __init__(self):
+        self.__forced_sums = []
         self.__last_roll = self.roll()
         self.__sum = sum(self.__last_roll)
 
     def roll(self) -> Tuple[int, int]:
         """roll the dice, returns result"""
-        self.__last_roll = randint(1, 6), randint(1, 6)
+        if self.__forced_sums:
+            dice_sum = self.__forced_sums.pop(0)
+            first = randint(max(1, dice_sum - 6), min(6, dice_sum - 1))
+            self.__last_roll = first, dice_sum - first
+        else:
+            self.__last_roll = randint(1, 6), randint(1, 6)
         self.__sum = sum(self.__last_roll)
         return self.__last_roll
 
+    def force(self, *sums: int) -> None:
+        """makes the next rolls sum to sums, in order (each a random pair of dice with that sum)"""
+        self.__forced_sums.extend(sums)
+
     def get_last_roll(self) -> Tuple[int, int]:
         """:returns the last dice roll"""
         return self.__last_roll
@@ -0,0 +1,73 @@
+from __future__ import annotations
+from typing import Sequence, List, Union
+import random as _random
+import threading
+from types import ModuleType
+
+"""
+A module for the random draws of the games (dice, shuffles, stolen cards, the agents' choices). Every thread draws
+from a stream of its own: the main thread from the random module's (so random.seed() still seeds a game played on
+it), every other thread from a random.Random of its own. Games played on several threads of one process neither
+draw from nor reseed each other's stream (e.g. while evaluating moves under seeds of their own).
+"""
+
+_local = threading.local()
+
+
+def choice(seq: Sequence):
+    """:returns a random element of seq"""
+    return _rng().choice(seq)
+
+
+def randrange(*args) -> int:
+    """:returns a random int of range(*args)"""
+    return _rng().randrange(*args)
+
+
+def randint(a: int, b: int) -> int:
+    """:returns a random int between a and b, both included"""
+    return _rng().randint(a, b)
+
+
+def random() -> float:
+    """:returns a random float in [0, 1)"""
+    return _rng().random()
+
+
+def shuffle(seq: List) -> None:
+    """shuffles seq in place"""
+    _rng().shuffle(seq)
+
+
+def sample(population: Sequence, k: int) -> List:
+    """:returns k distinct random elements of population"""
+    return _rng().sample(population, k)
+
+
+def getrandbits(k: int) -> int:
+    """:returns a random int of k bits"""
+    return _rng().getrandbits(k)
+
+
+def seed(a: int = None) -> None:
+    """seeds the stream of the current thread"""
+    _rng().seed(a)
+
+
+def getstate() -> tuple:
+    """:returns the state of the stream of the current thread (see setstate)"""
+    return _rng().getstate()
+
+
+def setstate(state: tuple) -> None:
+    """restores the stream of the current thread to state (see getstate)"""
+    _rng().setstate(state)
+
+
+def _rng() -> Union[ModuleType, _random.Random]:
+    # the stream of the current thread
+    try:
+        return _local.rng
+    except AttributeError:
+        _local.rng = _random if threading.current_thread() is threading.main_thread() else _random.Random()
+        return _local.rng
@@ -1,8 +1,10 @@
 from __future__ import annotations
-from typing import Generator, Union, List
-from itertools import combinations
+from typing import Generator, Union, List, Iterator, Tuple, Sequence, Set, Callable, TypeVar, Dict
+from itertools import combinations_with_replacement
+from collections import Counter, deque
 from enum import Enum
 from copy import deepcopy
+from GameRandom import choice, random, shuffle, sample
 import GameConstants as Consts
 import Board
 import Dice
@@ -12,6 +14,9 @@ import Moves
 import Buildable
 import hexgrid
 import GameLogger
+import StateValidator
+import Budget
+import CardTracker
 
 DEBUG = False
 
@@ -26,10 +31,45 @@ class GamePhase(Enum):  # used for self reference when agent wants to continue s
     GAME_OVER = 6
 
 
+T = TypeVar('T')
+MoveSubtype = Union[Consts.PurchasableType, Consts.DevType, None]
+
+# the kinds of moves (type and subtype) of the main game phase, in the order they are generated
+MAIN_PHASE_MOVE_KINDS = ((Moves.MoveType.PASS, None),
+                         (Moves.MoveType.BUY_DEV, None),
+                         *((Moves.MoveType.USE_DEV, dev_type) for dev_type in Consts.DEV_COUNTS),
+                         *((Moves.MoveType.BUILD, buildable) for buildable in Consts.BUILDABLES),
+                         (Moves.MoveType.TRADE, None))
+# year of plenty may take two of the same resource
+YOP_COMBINATIONS = list(combinations_with_replacement(Consts.YIELDING_RESOURCES, Consts.YOP_NUM_RESOURCES))
+NO_PARAMS = (None,)  # options of a move kind that takes no parameters
+MOVE_HISTORY_LEN = 100  # number of recent moves a session remembers (see move_history)
+FAST_FORWARD_BUILDS = (Consts.PurchasableType.CITY, Consts.PurchasableType.SETTLEMENT, Consts.PurchasableType.ROAD)
+FAST_FORWARD_MAX_ROADS = 1  # roads built in a fast forwarded turn
+
+
+class MoveComponent(Enum):  # parts of the legal moves that are cached until the state they depend on changes
+    BUILDABLE_NODES = 0
+    BUILDABLE_EDGES = 1
+    ROBBER_TARGETS = 2
+    AFFORDABLE = 3
+    TRADE_OFFERS = 4
+    ROAD_BUILDING_ROADS = 5
+
+
+# components invalidated by a build of any player (builds may also take a harbor / block a robber target)
+BOARD_COMPONENTS = tuple(MoveComponent)
+# components invalidated by any change to a player's hand or to the resources deck
+HAND_COMPONENTS = (MoveComponent.AFFORDABLE, MoveComponent.TRADE_OFFERS)
+
+
 class GameSession:
     """Class representing a Catan game instance, handles game flow, rule adherence, and logic of the game."""
-    def __init__(self, log: str = None, *players: Player.Player):
+    def __init__(self, log: str = None, *players: Player.Player, prune_moves: bool = False, validate_every: int = 0,
+                 decision_time: float = None, decision_simulations: int = None):
         assert Consts.MIN_PLAYERS <= len(players) <= Consts.MAX_PLAYERS
+        for player_id, player in enumerate(players, start=1):
+            player.set_id(player_id)  # ids are scoped to the session, no counter is shared between sessions
 
         # winning stats
         self.__winning_player = None
@@ -43,6 +83,7 @@ class GameSession:
         self.__num_players = len(self.__turn_order)
         self.__player_colors = ()
         self.__player_vp_histories = {str(p): [] for p in self.players()}
+        self.__card_tracker = CardTracker.CardTracker(self.__turn_order)
 
         # resources deck #
         self.__res_deck = Hand.Hand(*Consts.RES_DECK)
@@ -63,6 +104,22 @@ class GameSession:
         self.__vp_earned_this_phase = 0
         self.__possible_moves_this_phase = []
         self.__dev_used_this_turn = False
+        self.__move_cache = {component: {} for component in MoveComponent}
+        self.__prune_moves = prune_moves  # drop dominated moves and collapse equivalent ones before agents see them
+
+        # every decision's thinking budget, in seconds and / or simulations (None = unlimited) #
+        self.__decision_time = decision_time
+        self.__decision_simulations = decision_simulations
+
+        # state validation, every validate_every applied moves (0 = never) or every move in debug mode #
+        self.__validate_every = validate_every
+        self.__num_moves_applied = 0
+        self.__mock_dev_draws = False  # simulated dev purchases don't draw from the dev deck
+        self.__forced_draws = []  # cards the next random draws (dev purchases, robber steals) give, see force_draws
+
+        # keys of the most recent moves played, of every decision in every phase #
+        self.__move_history = deque(maxlen=MOVE_HISTORY_LEN)
+        self.__num_moves_played = 0
 
         # Saving a log of game sessions:
         self.__logger = GameLogger.GameLogger(log) if log is not None else None
@@ -95,19 +152,20 @@ class GameSession:
                     if player_hand_size > Consts.MAX_CARDS_IN_HAND:
                         self.__throw_player = player
                         self.__throw_player_hand_size = player_hand_size - (player_hand_size // 2)
-                        for _ in range(player_hand_size // 2):
-                            self.__possible_moves_this_phase = self.__get_possible_throw_moves(player)
-                            throw_move = player.choose(self.__possible_moves_this_phase, deepcopy(self))
-                            cards_thrown = throw_move.throws()
-                            dprint(f'[RUN GAME] player {player} had too many cards ({player_hand_size}), '
-                                   f'he threw {cards_thrown}')
-                            player.throw_cards(cards_thrown)
-                            self.__res_deck.insert(cards_thrown)
+                        self.__possible_moves_this_phase = self.__get_possible_throw_moves(player)
+                        throw_move = self.__choose_move(player)
+                        cards_thrown = throw_move.throws()
+                        dprint(f'[RUN GAME] player {player} had too many cards ({player_hand_size}), '
+                               f'he threw {cards_thrown}')
+                        player.throw_cards(cards_thrown)
+                        self.__card_tracker.lose(player, cards_thrown)
+                        self.__res_deck.insert(cards_thrown)
+                        self.__invalidate(*HAND_COMPONENTS)
 
                 # move robber
                 self.__phase = GamePhase.ROBBER_PLACE
                 self.__possible_moves_this_phase = self.__get_possible_knight_moves(curr_player, robber=True)
-                knight_move = curr_player.choose(self.__possible_moves_this_phase, deepcopy(self))
+                knight_move = self.__choose_move(curr_player)
 
                 assert isinstance(knight_move, Moves.UseKnightDevMove)
                 robber_hex = knight_move.hex_id()
@@ -121,16 +179,16 @@ class GameSession:
                 for player, hand in dist.items():
                     removed = self.__res_deck.remove_as_much(hand)
                     player.receive_cards(removed)
+                    self.__card_tracker.gain(player, removed)
                     dprint(f'[RUN GAME] player {player} received {removed}, '
                            f'now has {player.resource_hand()}')
+                self.__invalidate(*HAND_COMPONENTS)
 
             # query player for move #
             self.__phase = GamePhase.MAKE_MOVE
-            self.__possible_moves_this_phase = self.__get_possible_moves(curr_player)
-            moves_available = self.__possible_moves_this_phase
-            dprint(f'[RUN GAME] player {curr_player} can play:\n')
-            dprint('\n'.join(m.info() for m in moves_available) + '\n')
-            move_to_play = curr_player.choose(moves_available, deepcopy(self))
+            self.__possible_moves_this_phase = None
+            self.__print_possible_moves(curr_player)
+            move_to_play = self.__choose_move(curr_player)
 
             print(f'[RUN GAME] player {curr_player} is playing: {move_to_play.info()}')
 
@@ -143,11 +201,9 @@ class GameSession:
                 self.__logger.write_session(deepcopy(self))
 
             while move_to_play.get_type() != Moves.MoveType.PASS:
-                self.__possible_moves_this_phase = self.__get_possible_moves(curr_player)
-                moves_available = self.__possible_moves_this_phase
-                dprint(f'[RUN GAME] player {curr_player} can play:\n')
-                dprint('\n'.join(m.info() for m in moves_available) + '\n')
-                move_to_play = curr_player.choose(moves_available, deepcopy(self))
+                self.__possible_moves_this_phase = None
+                self.__print_possible_moves(curr_player)
+                move_to_play = self.__choose_move(curr_player)
                 print(f'[RUN GAME] player {curr_player} is playing: {move_to_play.info()}')
 
                 vp_before = curr_player.vp()
@@ -166,6 +222,8 @@ class GameSession:
                 self.__possible_moves_this_phase = []
                 print(f'\n\n\nGAME OVER - {curr_player} won!!!')
                 print("Game Ended After", self.__num_turns_played, "Turns")
+                for player in self.players():
+                    player.agent().game_over(player)
                 break
 
     def largest_army_player(self) -> Union[Player.Player, None]:
@@ -196,6 +254,10 @@ class GameSession:
         """:returns a list of the player instances in the game, in turn order"""
         return self.__turn_order
 
+    def card_tracker(self) -> CardTracker.CardTracker:
+        """:returns the counts of the game's cards as every player sees them"""
+        return self.__card_tracker
+
     def winner(self) -> Union[Player, None]:
         """if the game ended, :returns the player that won the game, None otherwise"""
         if self.is_game_over():
@@ -221,8 +283,18 @@ class GameSession:
         """:returns the number of VP earned in the current game phase (choice making phase)"""
         return self.__vp_earned_this_phase
 
-    def simulate_game(self, move_to_play: Moves.Move = None) -> List[Moves.Move]:
-        """simulates a move to play, returns list of valid moves to play next"""
+    def simulate_game(self, move_to_play: Moves.Move = None, lazy: bool = False) -> Union[List[Moves.Move], None]:
+        """simulates a move to play, returns list of valid moves to play next.
+        if lazy, the next moves aren't listed (None is returned), query them with possible_move_counts() etc."""
+        if move_to_play is not None:
+            self.__record_move(move_to_play)
+        moves = self.__simulate_game(move_to_play)
+        if lazy:
+            return None
+        return moves if moves is not None else self.possible_moves()
+
+    def __simulate_game(self, move_to_play: Moves.Move = None) -> Union[List[Moves.Move], None]:
+        # returns the listed moves of the next decision, None if they are left to be generated on demand
         if self.__phase == GamePhase.START:
             return self.__start_sim()
 
@@ -263,10 +335,203 @@ class GameSession:
         else:
             print('ERROR didnt find new player obj in deepcopy')
 
+    def can_fast_forward(self) -> bool:
+        """:returns True iff the current turn can be fast forwarded (see fast_forward_turn)"""
+        return self.__phase in (GamePhase.ROBBER_THROW, GamePhase.ROBBER_PLACE, GamePhase.MAKE_MOVE)
+
+    def fast_forward_turn(self) -> None:
+        """simulates the rest of the current turn without generating any moves: oversized hands throw random cards,
+        the robber robs a random target, the current player builds greedily what it can afford (cities, then
+        settlements, then a road, on random spots) and passes. the next turn starts as it does after
+        simulate_game(pass_move, lazy=True)"""
+        assert self.can_fast_forward()
+        if self.__phase == GamePhase.ROBBER_THROW:
+            self.__fast_forward_throws()
+            self.__phase = GamePhase.ROBBER_PLACE
+        if self.__phase == GamePhase.ROBBER_PLACE:
+            self.__fast_forward_robber()
+            self.__phase = GamePhase.MAKE_MOVE
+
+        self.__fast_forward_builds()
+        self.__end_turn_sim()
+
+    def force_dice(self, *sums: int) -> None:
+        """makes the next dice rolls of the game sum to sums, in order (e.g. to stratify the rolls of simulations)"""
+        self.__dice.force(*sums)
+
+    def force_draws(self, *cards: Consts.CardType) -> None:
+        """makes the next random card draws of the game (a dev card bought, a card stolen by the robber) give cards,
+        in order. a forced card the hand drawn from doesn't hold is drawn at random instead"""
+        self.__forced_draws.extend(cards)
+
+    def draw_outcomes(self, move: Moves.Move) -> List[Tuple[Consts.CardType, float]]:
+        """:returns the cards move draws at random when simulated (see simulate_game), with their probabilities.
+        empty if move draws no card at random"""
+        if isinstance(move, Moves.BuyDevMove):
+            deck = self.__mock_dev_deck(move.player())
+        elif (isinstance(move, Moves.UseKnightDevMove) and move.take_from() is not None and
+              move.take_from() != move.player()):
+            deck = move.take_from().resource_hand()
+        else:
+            return []
+        card_counts = Counter(deck)
+        return [(card, count / deck.size()) for card, count in card_counts.items()]
+
+    def determinize(self, player: Player.Player) -> None:
+        """resamples, in place, what player can't see: the resource cards of its opponents are pooled and dealt back
+        at random, consistently with what everyone knows about their hands (every opponent keeps the cards it's
+        known to hold and gets no more of a resource than it may hold, see card_tracker), and their dev cards are
+        dealt back together with the dev deck. what's public is kept: every hand's size, the resources deck, the
+        board and the used dev cards (searching a determinized copy of the game doesn't use information player
+        doesn't have)"""
+        opponents = [p for p in self.players() if p != player]
+        opp_bounds = [self.__card_tracker.resource_bounds(opp) for opp in opponents]
+        GameSession.__redeal_resources([opp.resource_hand() for opp in opponents], opp_bounds)
+        GameSession.__redeal([opp.dev_hand() for opp in opponents] + [self.__dev_deck])
+        assert all(least <= opp.resource_hand().cards_of_type(resource).size() <= most
+                   for opp, bounds in zip(opponents, opp_bounds) for resource, (least, most) in bounds.items())
+
+        # dev cards an opponent bought this turn are some of the cards it holds now
+        curr_player = self.__curr_player_sim
+        num_bought = self.__dev_cards_bought_this_turn.size()
+        if curr_player is not None and curr_player != player and num_bought:
+            self.__dev_cards_bought_this_turn = Hand.Hand(*sample(list(curr_player.dev_hand()), num_bought))
+        self.__invalidate(*HAND_COMPONENTS)
+
+    def trade_ratios(self, player: Player.Player) -> Dict[Consts.ResourceType, int]:
+        """:returns the best rate player trades every yielding resource at with the deck (cards given per card)"""
+        general_ratio = Consts.GENERAL_HARBOR_TRADE_RATIO if self.__has_general_harbor(player) \
+            else Consts.DECK_TRADE_RATIO
+        return {resource: Consts.RESOURCE_HARBOR_TRADE_RATIO if resource in player.harbor_resources() else general_ratio
+                for resource in Consts.YIELDING_RESOURCES}
+
+    def bank_resources(self) -> Hand.Hand:
+        """:returns a copy of the resources left in the deck (the cards trades and Year of Plenty can receive)"""
+        return deepcopy(self.__res_deck)
+
+    def num_devs_left(self) -> int:
+        """:returns the number of dev cards left to buy"""
+        return self.__dev_deck.size()
+
+    def buildable_spots(self, player: Player.Player, buildable: Consts.PurchasableType) -> List[int]:
+        """:returns the spots player may build buildable on now, whether it can afford it or not: nodes for settlements
+        and cities, edges for roads (empty if it has no pieces of buildable left)"""
+        if buildable == Consts.PurchasableType.SETTLEMENT and self.__has_remaining_settlements(player):
+            return list(self.__buildable_nodes(player))
+        elif buildable == Consts.PurchasableType.CITY and self.__has_remaining_cities(player):
+            return player.settlement_nodes()
+        elif buildable == Consts.PurchasableType.ROAD and self.__has_remaining_roads(player):
+            return list(self.__buildable_edges(player))
+        return []
+
+    def num_moves_played(self) -> int:
+        """:returns the number of moves played so far in the game, of every decision in every phase"""
+        return self.__num_moves_played
+
+    def move_history(self, num_moves: int) -> Union[List[Tuple], None]:
+        """:returns the keys (see Move.key) of the last num_moves moves played, oldest first.
+        None if they are not all remembered (only the last MOVE_HISTORY_LEN moves are)"""
+        if num_moves > len(self.__move_history):
+            return None
+        return list(self.__move_history)[len(self.__move_history) - num_moves:]
+
+    def validate(self) -> None:
+        """checks the invariants of the game state (see StateValidator), raises AssertionError if any is violated"""
+        StateValidator.validate(self, self.__res_deck, None if self.__mock_dev_draws else self.__dev_deck)
+
     def possible_moves(self) -> List[Moves.Move]:
         """:returns list of possible moves to currently play"""
+        if self.__possible_moves_this_phase is None:  # main phase moves are only listed when asked for
+            self.__possible_moves_this_phase = self.__get_possible_moves(self.__curr_player_sim)
         return self.__possible_moves_this_phase
 
+    def possible_move_counts(self) -> Dict[Tuple[Moves.MoveType, MoveSubtype], int]:
+        """:returns the number of currently possible moves of every (move type, subtype) kind that can be played,
+        without generating the moves themselves"""
+        if not self.__lazy_moves():
+            return Counter((m.get_type(), m.subtype()) for m in self.__possible_moves_this_phase)
+
+        player = self.__curr_player_sim
+        counts = {}
+        for move_type, subtype in MAIN_PHASE_MOVE_KINDS:
+            num_moves = len(self.__move_options(player, move_type, subtype))
+            if num_moves:
+                counts[(move_type, subtype)] = num_moves
+        return counts
+
+    def possible_move_at(self, move_type: Moves.MoveType, subtype: MoveSubtype, index: int) -> Moves.Move:
+        """:returns the index-th currently possible move of the given kind (indexed as in possible_move_counts()),
+        only that move is made"""
+        if not self.__lazy_moves():
+            return [m for m in self.__possible_moves_this_phase
+                    if m.get_type() == move_type and m.subtype() == subtype][index]
+
+        player = self.__curr_player_sim
+        return self.__make_move(player, move_type, subtype, self.__move_options(player, move_type, subtype)[index])
+
+    def possible_move_types(self) -> List[Moves.MoveType]:
+        """:returns the types of moves currently possible to play, without generating the moves themselves"""
+        return list(dict.fromkeys(move_type for move_type, _ in self.__move_kinds()))
+
+    def possible_move_subtypes(self, move_type: Moves.MoveType) -> List[MoveSubtype]:
+        """:returns the subtypes (i.e. buildables for BUILD, dev cards for USE_DEV) currently possible to play
+        within move_type"""
+        return [subtype for mtype, subtype in self.__move_kinds() if mtype == move_type]
+
+    def possible_moves_of_type(self, move_type: Moves.MoveType, subtype: MoveSubtype = None) -> Iterator[Moves.Move]:
+        """lazily generates the currently possible moves of move_type (and of subtype, if given)"""
+        if not self.__lazy_moves():
+            return (m for m in self.__possible_moves_this_phase
+                    if m.get_type() == move_type and (subtype is None or m.subtype() == subtype))
+
+        player = self.__curr_player_sim
+        return (move for mtype, st in MAIN_PHASE_MOVE_KINDS
+                if mtype == move_type and (subtype is None or st == subtype)
+                for move in self.__gen_moves(player, mtype, st))
+
+    def num_possible_moves(self, move_type: Moves.MoveType = None, subtype: MoveSubtype = None) -> int:
+        """:returns the number of currently possible moves (of move_type and subtype, if given),
+        without generating the moves themselves"""
+        if not self.__lazy_moves():
+            return sum(1 for m in self.__possible_moves_this_phase
+                       if (move_type is None or m.get_type() == move_type) and
+                       (subtype is None or m.subtype() == subtype))
+
+        player = self.__curr_player_sim
+        return sum(len(self.__move_options(player, mtype, st)) for mtype, st in MAIN_PHASE_MOVE_KINDS
+                   if (move_type is None or mtype == move_type) and (subtype is None or st == subtype))
+
+    def is_legal(self, move: Moves.Move) -> bool:
+        """:returns True iff move can be played in the current game phase, checked directly against the phase,
+        the player's hand and pieces and the board (without generating the possible moves).
+        moves dropped by move pruning are still legal"""
+        if self.__phase == GamePhase.PRE_GAME_SETTLEMENT:
+            return (move.player() == self.__curr_player_sim and isinstance(move, Moves.BuildMove) and
+                    move.builds() == Consts.PurchasableType.SETTLEMENT and
+                    move.at() in Board.LEGAL_NODES and self.__is_distant_node(move.at()))
+
+        elif self.__phase == GamePhase.PRE_GAME_ROAD:
+            return (move.player() == self.__curr_player_sim and isinstance(move, Moves.BuildMove) and
+                    move.builds() == Consts.PurchasableType.ROAD and
+                    move.at() in self.board().get_adj_edges_to_node(self.__pre_game_settlement_node) and
+                    move.at() not in self.board().edges())
+
+        elif self.__phase == GamePhase.ROBBER_THROW:
+            num_to_throw = self.__throw_player.resource_hand_size() - self.__throw_player_hand_size
+            return (move.player() == self.__throw_player and isinstance(move, Moves.ThrowMove) and
+                    move.throws().size() == num_to_throw and
+                    all(card in Consts.YIELDING_RESOURCES for card in move.throws()) and
+                    self.__throw_player.resource_hand().contains(move.throws()))
+
+        elif self.__phase == GamePhase.ROBBER_PLACE:
+            return (move.player() == self.__curr_player_sim and isinstance(move, Moves.UseKnightDevMove) and
+                    move.robber_activated() and self.__is_legal_robber_target(move))
+
+        elif self.__phase == GamePhase.MAKE_MOVE and move.player() == self.__curr_player_sim:
+            return self.__is_legal_main_phase_move(move)
+
+        return False
+
     def potential_probability_score(self, player: Player) -> float:
         """a scoring function that evaluates the potential probability value of a player's locality on the board"""
         def get_player_nodes(p):
@@ -395,13 +660,19 @@ class GameSession:
         print('[CATAN] turn order will be:\n' + '\n'.join(f'Player.Player {player}' for roll, player in rolls))
         return [player for roll, player in rolls]
 
-    def __restore(self, saved_self: GameSession) -> None:
-        self.__board = saved_self.__board
-        self.__dice = saved_self.__dice
-        self.__turn_order = saved_self.__turn_order
-        self.__res_deck = saved_self.__res_deck
-        self.__dev_deck = saved_self.__dev_deck
-        self.__num_players = saved_self.__num_players
+    def __cached(self, component: MoveComponent, key, compute: Callable[[], T]) -> T:
+        entries = self.__move_cache[component]
+        if key not in entries:
+            entries[key] = compute()
+        return entries[key]
+
+    def __invalidate(self, *components: MoveComponent) -> None:
+        for component in components:
+            self.__move_cache[component] = {}
+
+    def __build(self, buildable: Buildable.Buildable) -> None:
+        self.__board.build(buildable)
+        self.__invalidate(*BOARD_COMPONENTS)
 
     def __turn_generator(self, num_players: int) -> Generator[Player.Player]:
         while True:
@@ -423,14 +694,14 @@ class GameSession:
                 self.__phase = GamePhase.PRE_GAME_SETTLEMENT
                 self.__possible_moves_this_phase = self.__get_possible_build_settlement_moves(curr_player,
                                                                                               pre_game=True)
-                build_settlement_move = curr_player.choose(self.__possible_moves_this_phase, deepcopy(self))
+                build_settlement_move = self.__choose_move(curr_player)
 
                 # add new settlement to game
                 settlement_node = build_settlement_move.at()
                 self.__pre_game_settlement_node = settlement_node
                 settlement = Buildable.Buildable(curr_player, settlement_node, Consts.PurchasableType.SETTLEMENT)
                 curr_player.add_buildable(settlement)
-                self.__board.build(settlement)
+                self.__build(settlement)
 
                 dprint(self.board())
 
@@ -440,14 +711,13 @@ class GameSession:
                 self.__possible_moves_this_phase = [
                     Moves.BuildMove(curr_player, Consts.PurchasableType.ROAD, edge, free=True)
                     for edge in adj_edges]
-                possible_road_moves = self.__possible_moves_this_phase
-                build_adj_road_move = curr_player.choose(possible_road_moves, deepcopy(self))
+                build_adj_road_move = self.__choose_move(curr_player)
 
                 # add new road to game
                 road_edge = build_adj_road_move.at()
                 road = Buildable.Buildable(curr_player, road_edge, Consts.PurchasableType.ROAD)
                 curr_player.add_buildable(road)
-                self.__board.build(road)
+                self.__build(road)
 
                 print(f'[PRE GAME] player {curr_player} placed settlement at {hex(settlement_node)}, '
                        f'road at {hex(road_edge)}')
@@ -456,6 +726,8 @@ class GameSession:
                     starting_resources = self.__board.resource_distributions_by_node(settlement_node)
                     self.__res_deck.remove(starting_resources)
                     curr_player.receive_cards(starting_resources)
+                    self.__card_tracker.gain(curr_player, starting_resources)
+                    self.__invalidate(*HAND_COMPONENTS)
                     dprint(f'[PRE GAME] player {curr_player} received {starting_resources} '
                            f'for his 2nd settlement at {hex(settlement_node)}')
 
@@ -465,6 +737,7 @@ class GameSession:
     def __robber_protocol(self, curr_player: Player.Player, robber_hex_id: int, opp: Player.Player,
                           printout=True) -> None:
         self.__board.move_robber_to(robber_hex_id)
+        self.__invalidate(MoveComponent.ROBBER_TARGETS)
         if printout:
             dprint(f'[ROBBER PROTOCOL] player {curr_player} placed robber at hex id {robber_hex_id}')
 
@@ -472,14 +745,15 @@ class GameSession:
         possible_players = set()
         for node in hexgrid.nodes_touching_tile(robber_hex_id + 1):
             if node in self.__board.nodes():
-                opp = self.__board.nodes().get(node).player()
-                if opp != curr_player:
-                    possible_players.add(opp)
+                adj_player = self.__board.nodes().get(node).player()
+                if adj_player != curr_player:
+                    possible_players.add(adj_player)
 
         if printout:
             dprint(f'[ROBBER PROTOCOL] opponent players adjacent to hex: {possible_players}')
 
-        # choose victim
+        # choose victim, as a player of this session (the move may have been made in another copy of the game)
+        opp = next((adj_player for adj_player in possible_players if adj_player == opp), None)
         if opp is not None:
 
             if printout:
@@ -488,8 +762,10 @@ class GameSession:
             # take card from player
             opp_hand = opp.resource_hand()
             if opp_hand.size():
-                removed_card = opp_hand.remove_random_card()
+                self.__card_tracker.steal(curr_player, opp)
+                removed_card = self.__draw_card(opp_hand)
                 curr_player.receive_cards(removed_card)
+                self.__invalidate(*HAND_COMPONENTS)
                 if printout:
                     dprint(f'[ROBBER PROTOCOL] player {curr_player} took {removed_card} from player {opp}')
             elif printout:
@@ -507,145 +783,212 @@ class GameSession:
             if p == move.player():
                 player = p
 
-        saved_state = deepcopy(self)
-        try:
-            if isinstance(move, Moves.ThrowMove):
-                card = move.throws()
-                self.__res_deck.insert(card)
-                player.resource_hand().remove(card)
-
-            if isinstance(move, Moves.BuyDevMove):
-                dev_cost = Consts.COSTS.get(Consts.PurchasableType.DEV_CARD)
-                player.throw_cards(dev_cost)
-                self.__res_deck.insert(dev_cost)
-                # if mock use random card from orig deck minus all used cards
-                if mock:
-                    temp_deck = Hand.Hand(*Consts.DEV_DECK)
-                    for p in self.players():
-                        used = p.used_dev_hand()
-                        temp_deck.remove(used)
-                    card = temp_deck.remove_random_card()
-                    del temp_deck
-                else:
-                    card = self.__dev_deck.remove_random_card()
-                player.receive_cards(card)
-                self.__dev_cards_bought_this_turn.insert(card)
-                if printout:
-                    dprint(f'[APPLY MOVE] player {player} bought dev card, got {card}')
+        if not self.is_legal(move):
+            dprint(f'player {player} tried to do illegal move {move.info()}')
+            if DEBUG:
+                exit()
+            return
+
+        if isinstance(move, Moves.ThrowMove):
+            card = move.throws()
+            self.__res_deck.insert(card)
+            player.resource_hand().remove(card)
+            self.__card_tracker.lose(player, card)
+
+        if isinstance(move, Moves.BuyDevMove):
+            dev_cost = Consts.COSTS.get(Consts.PurchasableType.DEV_CARD)
+            player.throw_cards(dev_cost)
+            self.__card_tracker.lose(player, dev_cost)
+            self.__res_deck.insert(dev_cost)
+            # if mock use random card from orig deck minus all used cards (and the player's own)
+            if mock:
+                self.__mock_dev_draws = True
+                card = self.__draw_card(self.__mock_dev_deck(player))
+            else:
+                card = self.__dev_deck.remove_random_card()
+            player.receive_cards(card)
+            self.__dev_cards_bought_this_turn.insert(card)
+            if printout:
+                dprint(f'[APPLY MOVE] player {player} bought dev card, got {card}')
+
+        elif isinstance(move, Moves.BuildMove):
+            if move.builds() == Consts.PurchasableType.CITY:
+                settlement_node_to_delete = move.at()
+                del self.board().nodes()[settlement_node_to_delete]
+                player.remove_settlement(settlement_node_to_delete)
+
+            buildable_cost = Consts.COSTS.get(move.builds()) if not move.is_free() else Hand.Hand()
+            player.throw_cards(buildable_cost)
+            self.__card_tracker.lose(player, buildable_cost)
+            self.__res_deck.insert(buildable_cost)
+
+            buildable = Buildable.Buildable(player, move.at(), move.builds())
+            player.add_buildable(buildable)
+            self.__build(buildable)
+            if printout:
+                dprint(f'[APPLY MOVE] player {player} built {move.builds()} at {move.at()}')
 
-            elif isinstance(move, Moves.BuildMove):
-                if move.builds() == Consts.PurchasableType.CITY:
-                    settlement_node_to_delete = move.at()
-                    del self.board().nodes()[settlement_node_to_delete]
-                    player.remove_settlement(settlement_node_to_delete)
+            # a road may lengthen a road, a settlement may cut one
+            if buildable.type() in (Consts.PurchasableType.ROAD, Consts.PurchasableType.SETTLEMENT):
+                self.__update_longest_road()
 
-                buildable_cost = Consts.COSTS.get(move.builds()) if not move.is_free() else Hand.Hand()
-                player.throw_cards(buildable_cost)
-                self.__res_deck.insert(buildable_cost)
+        elif isinstance(move, Moves.UseDevMove):
+            dev_used = move.uses()
+            if isinstance(move, Moves.UseKnightDevMove) and move.robber_activated():
+                pass
+            else:
+                if self.__dev_used_this_turn:
+                    print('ERROR, used dev more than once in a turn')
+                player.use_dev(dev_used)  # remove the card
+                self.__card_tracker.use_dev(dev_used)
+                self.__dev_used_this_turn = True
+            if printout:
+                dprint(f'[APPLY MOVE] player {player} used {dev_used} dev card')
 
-                buildable = Buildable.Buildable(player, move.at(), move.builds())
-                player.add_buildable(buildable)
-                self.__board.build(buildable)
-                if printout:
-                    dprint(f'[APPLY MOVE] player {player} built {move.builds()} at {move.at()}')
-
-                # update longest road player
-                if buildable.type() == Consts.PurchasableType.ROAD:
-                    longest_road_player = self.longest_road_player()
-                    for player in self.players():
-                        player.set_longest_road(player == longest_road_player)
-
-            elif isinstance(move, Moves.UseDevMove):
-                dev_used = move.uses()
-                if isinstance(move, Moves.UseKnightDevMove) and move.robber_activated():
-                    pass
-                else:
-                    if self.__dev_used_this_turn:
-                        print('ERROR, used dev more than once in a turn')
-                    player.use_dev(dev_used)  # remove the card
-                    self.__dev_used_this_turn = True
+            if isinstance(move, Moves.UseKnightDevMove):
+                # update largest army
+                largest_army_player = self.largest_army_player()
+                for player in self.players():
+                    player.set_largest_army(player == largest_army_player)
+
+                hex_id = move.hex_id()
+                opp = move.take_from()
+                self.__robber_protocol(player, hex_id, opp, printout=printout)
+
+            elif isinstance(move, Moves.UseMonopolyDevMove):
+                hand_gained = Hand.Hand()
+                resource_type = move.resource()
                 if printout:
-                    dprint(f'[APPLY MOVE] player {player} used {dev_used} dev card')
+                    dprint(f'[APPLY MOVE] player {player} chose {resource_type} as monopoly resource')
+
+                for opp in self.players():
+                    if opp != player:
+                        cards = opp.resource_hand().remove_by_type(resource_type)
+                        self.__card_tracker.lose_all(opp, resource_type)
+                        dprint(f'[APPLY MOVE] opponent {opp} gave {cards}')
+                        hand_gained.insert(cards)
 
-                if isinstance(move, Moves.UseKnightDevMove):
-                    # update largest army
-                    largest_army_player = self.largest_army_player()
-                    for player in self.players():
-                        player.set_largest_army(player == largest_army_player)
+                player.receive_cards(hand_gained)
+                self.__card_tracker.gain(player, hand_gained)
 
-                    hex_id = move.hex_id()
-                    opp = move.take_from()
-                    self.__robber_protocol(player, hex_id, opp, printout=printout)
+                if printout:
+                    dprint(f'[APPLY MOVE] player {player} gained {hand_gained.size()} {resource_type}')
 
-                elif isinstance(move, Moves.UseMonopolyDevMove):
-                    hand_gained = Hand.Hand()
-                    resource_type = move.resource()
+            elif isinstance(move, Moves.UseRoadBuildingDevMove):
+                for edge in move.roads():
+                    road = Buildable.Buildable(player, edge, Consts.PurchasableType.ROAD)
+                    self.__build(road)
+                    player.add_buildable(road)
                     if printout:
-                        dprint(f'[APPLY MOVE] player {player} chose {resource_type} as monopoly resource')
+                        dprint(f'[APPLY MOVE] player {player} built road at {edge}')
 
-                    for opp in self.players():
-                        if opp != player:
-                            cards = opp.resource_hand().remove_by_type(resource_type)
-                            dprint(f'[APPLY MOVE] opponent {opp} gave {cards}')
-                            hand_gained.insert(cards)
+                self.__update_longest_road()
 
-                    player.receive_cards(hand_gained)
+            elif isinstance(move, Moves.UseYopDevMove):
+                resources = move.resources()
+                self.__res_deck.remove(resources)
+                player.receive_cards(resources)
+                self.__card_tracker.gain(player, resources)
+                if printout:
+                    dprint(f'[APPLY MOVE] player {player} chose {resources} as YOP resources')
 
-                    if printout:
-                        dprint(f'[APPLY MOVE] player {player} gained {hand_gained.size()} {resource_type}')
-
-                elif isinstance(move, Moves.UseRoadBuildingDevMove):
-                    for _ in range(Consts.ROAD_BUILDING_NUM_ROADS):
-                        self.__possible_moves_this_phase = self.__get_possible_build_road_moves(player, free=True)
-                        possible_road_moves = self.__possible_moves_this_phase
-                        if not possible_road_moves:
-                            break
-
-                        road_move = player.choose(possible_road_moves, deepcopy(self))
-
-                        assert isinstance(road_move, Moves.BuildMove)
-                        road = Buildable.Buildable(player, road_move.at(), Consts.PurchasableType.ROAD)
-                        self.__board.build(road)
-                        player.add_buildable(road)
-                        dprint(f'[APPLY MOVE] player {player} built road at {road_move.at()}')
-
-                    # update longest road player
-                    longest_road_player = self.longest_road_player()
-                    for player in self.players():
-                        player.set_longest_road(player == longest_road_player)
-
-                elif isinstance(move, Moves.UseYopDevMove):
-                    resources = move.resources()
-                    self.__res_deck.remove(resources)
-                    player.receive_cards(resources)
-                    if printout:
-                        dprint(f'[APPLY MOVE] player {player} chose {resources} as YOP resources')
+        elif isinstance(move, Moves.TradeMove):
+            cards_received = move.gets()
+            player.receive_cards(cards_received)
+            self.__card_tracker.gain(player, cards_received)
+            self.__res_deck.remove(cards_received)
 
-            elif isinstance(move, Moves.TradeMove):
-                cards_received = move.gets()
-                player.receive_cards(cards_received)
-                self.__res_deck.remove(cards_received)
+            cards_given = move.gives()
+            player.throw_cards(cards_given)
+            self.__card_tracker.lose(player, cards_given)
+            self.__res_deck.insert(cards_given)
 
-                cards_given = move.gives()
-                player.throw_cards(cards_given)
-                self.__res_deck.insert(cards_given)
+            if printout:
+                dprint(f'[APPLY MOVE] player {player} traded {cards_given} for {cards_received}')
 
-                if printout:
-                    dprint(f'[APPLY MOVE] player {player} traded {cards_given} for {cards_received}')
+        self.__invalidate(*HAND_COMPONENTS)
+        self.__num_moves_applied += 1
+        if DEBUG or (self.__validate_every and self.__num_moves_applied % self.__validate_every == 0):
+            self.validate()
 
-        except ValueError as e:
-            dprint(f'player {player} tried to do move {move.get_type().name}, got error: \n{e}')
-            if DEBUG:
-                exit()
-            self.__restore(saved_state)
-            del saved_state
+    def __mock_dev_deck(self, player: Player.Player) -> Hand.Hand:
+        # the deck simulated dev purchases draw from: the dev cards the player hasn't seen
+        unseen_devs = self.__card_tracker.unseen_devs(player)
+        return unseen_devs if unseen_devs.size() > 0 else self.__dev_deck
+
+    @staticmethod
+    def __redeal(hands: List[Hand.Hand]) -> None:
+        # pools the cards of hands and deals them back at random, every hand keeps its size
+        pool = [card for hand in hands for card in hand]
+        shuffle(pool)
+        for hand in hands:
+            hand_size = hand.size()
+            hand.remove(Hand.Hand(*hand))
+            hand.insert(Hand.Hand(*pool[:hand_size]))
+            pool = pool[hand_size:]
+
+    @staticmethod
+    def __redeal_resources(hands: List[Hand.Hand],
+                           hands_bounds: List[Dict[Consts.ResourceType, Tuple[int, int]]]) -> None:
+        # deals the resource cards of hands back at random under their (least, most) bounds of every resource:
+        # every hand keeps its size and the least of every resource, the rest of the cards are pooled and dealt
+        # card by card to the hands, a card only to a hand that may hold one more of it. the hands as they are
+        # are a deal under the bounds, so one is always found
+        known = [Counter({resource: least for resource, (least, _) in bounds.items()}) for bounds in hands_bounds]
+        pool = sum((Counter(hand) for hand in hands), Counter()) - sum(known, Counter())
+        num_unknown = [hand.size() - sum(hand_known.values()) for hand, hand_known in zip(hands, known)]
+        deal = GameSession.__bounded_deal(pool, known, hands_bounds, num_unknown)
+        for hand, hand_known, dealt in zip(hands, known, deal):
+            hand.remove(Hand.Hand(*hand))
+            hand.insert(Hand.Hand(*(hand_known + dealt).elements()))
 
     @staticmethod
-    def __can_purchase(player: Player.Player, item: Consts.PurchasableType) -> bool:
+    def __bounded_deal(pool: Counter, known: List[Counter],
+                       hands_bounds: List[Dict[Consts.ResourceType, Tuple[int, int]]],
+                       num_unknown: List[int]) -> Union[List[Counter], None]:
+        # the cards of pool dealt at random, num_unknown to every hand (on top of its known ones) under its bounds:
+        # every card is drawn from what's left in pool among the ones the hand may hold one more of, backtracking
+        # from the draws that leave a hand unfillable. None if there's no such deal
+        dead_ends = set()
+
+        def deal_from(hand_idx: int, dealt: Counter, cards_left: Counter) -> Union[List[Counter], None]:
+            if hand_idx == len(num_unknown):
+                return []
+            if sum(dealt.values()) == num_unknown[hand_idx]:
+                rest = deal_from(hand_idx + 1, Counter(), cards_left)
+                return [dealt] + rest if rest is not None else None
+            state_key = (hand_idx, frozenset(dealt.items()), frozenset(cards_left.items()))
+            if state_key in dead_ends:
+                return None
+            hand_known, bounds = known[hand_idx], hands_bounds[hand_idx]
+            fitting = [resource for resource in cards_left
+                       if hand_known[resource] + dealt[resource] < bounds[resource][1]]
+            # a random order of the fitting cards, each first with a chance in proportion to its count left
+            for card in sorted(fitting, key=lambda resource: random() ** (1 / cards_left[resource]), reverse=True):
+                deal = deal_from(hand_idx, dealt + Counter({card: 1}), cards_left - Counter({card: 1}))
+                if deal is not None:
+                    return deal
+            dead_ends.add(state_key)
+            return None
+
+        return deal_from(0, Counter(), +pool)
+
+    def __draw_card(self, hand: Hand.Hand) -> Hand.Hand:
+        # removes a random card from hand (the next forced draw, if hand holds it), returns it
+        if self.__forced_draws:
+            forced_card = Hand.Hand(self.__forced_draws.pop(0))
+            if hand.contains(forced_card):
+                hand.remove(forced_card)
+                return forced_card
+        return hand.remove_random_card()
+
+    def __can_purchase(self, player: Player.Player, item: Consts.PurchasableType) -> bool:
+        return item in self.__cached(MoveComponent.AFFORDABLE, player.get_id(), lambda: self.__affordable(player))
+
+    @staticmethod
+    def __affordable(player: Player.Player) -> Set[Consts.PurchasableType]:
         players_hand = player.resource_hand()
-        item_cost = Consts.COSTS.get(item)
-        retval = players_hand.contains(item_cost)
-        return retval
+        return {item for item, item_cost in Consts.COSTS.items() if players_hand.contains(item_cost)}
 
     @staticmethod
     def __has_remaining_settlements(player: Player.Player) -> bool:
@@ -673,43 +1016,53 @@ class GameSession:
                 hands.append(homogeneous_hand)
         return hands
 
+    def __get_possible_throw_moves(self, player: Player.Player) -> List[Moves.ThrowMove]:
+        # the whole discard as one move, a move for every distinct multiset of the cards to throw
+        card_counts = sorted(Counter(card for card in player.resource_hand()
+                                     if card in Consts.YIELDING_RESOURCES).items(), key=lambda item: item[0].value)
+        num_to_throw = player.resource_hand_size() - self.__throw_player_hand_size
+        throws = GameSession.__card_multisets(card_counts, num_to_throw)
+        if self.__prune_moves:
+            throws = GameSession.__prune_throws(Counter(player.resource_hand()), throws)
+        return [Moves.ThrowMove(player, Hand.Hand(*cards)) for cards in throws]
+
     @staticmethod
-    def __get_possible_throw_moves(player: Player.Player) -> List[Moves.ThrowMove]:
-        players_cards = list(set([card for card in player.resource_hand() if card in Consts.YIELDING_RESOURCES]))
-        throw_moves = [Moves.ThrowMove(player, Hand.Hand(card)) for card in players_cards]
-        return throw_moves
+    def __card_multisets(card_counts: List[Tuple[Consts.ResourceType, int]],
+                         size: int) -> List[List[Consts.ResourceType]]:
+        # every distinct multiset of size cards out of card_counts ((card, count) pairs)
+        if size == 0:
+            return [[]]
+        if not card_counts or sum(count for _, count in card_counts) < size:
+            return []
+        (card, count), rest = card_counts[0], card_counts[1:]
+        return [[card] * num_cards + cards for num_cards in range(min(count, size), -1, -1)
+                for cards in GameSession.__card_multisets(rest, size - num_cards)]
 
-    def __get_possible_knight_moves(self, player: Player.Player, robber: bool = False) -> List[Moves.UseKnightDevMove]:
-        moves = []
-        dev_type = Consts.DevType.KNIGHT
-        if robber or player.dev_hand().contains(Hand.Hand(dev_type)):  # if has it
-            # if wasnt bought this turn or had at least 1 more from before this turn
-            if robber or (dev_type not in self.__dev_cards_bought_this_turn or
-                          player.dev_hand().cards_of_type(dev_type).size() >
-                          self.__dev_cards_bought_this_turn.cards_of_type(dev_type).size()):
-                robber_hex = self.board().robber_hex()
-                for hex_tile in self.board().hexes():  # get hex, cant place at same place or back at desert
-                    if hex_tile is not robber_hex and hex_tile.resource() != Consts.ResourceType.DESERT:
-                        opponents_on_hex = []  # finding opponents with buildables around hex
-                        for node in hex_tile.nodes():  # get node around hex that is occupied
-                            if self.board().nodes().get(node) is not None:
-                                opp = self.board().nodes().get(node).player()
-                                if opp != player and opp not in opponents_on_hex:  # if its not occupied by you...
-                                    opponents_on_hex.append(opp)  # then its an opponent
-                        if opponents_on_hex:
-                            for opp in opponents_on_hex:
-                                moves.append(
-                                    Moves.UseKnightDevMove(player, hex_tile.id(), opp, robber_activated=robber))
-                        else:  # no opponents, make move without opp id
-                            moves.append(Moves.UseKnightDevMove(player, hex_tile.id(), None, robber_activated=robber))
-        return moves
+    @staticmethod
+    def __prune_throws(hand: Counter, throws: List[List[Consts.ResourceType]]) -> List[List[Consts.ResourceType]]:
+        # a discard is dominated if another one leaves a hand at least as close to every purchasable (in cards
+        # missing from its cost), and closer to one of them. of equally close ones, only the first is kept
+        def cards_missing(cards: List[Consts.ResourceType]) -> Tuple[int, ...]:
+            kept = hand - Counter(cards)
+            return tuple(sum(max(0, amount - kept[card]) for card, amount in Counter(cost).items())
+                         for cost in Consts.COSTS.values())
+
+        missing = list(dict.fromkeys(cards_missing(cards) for cards in throws))
+        best = {vector for vector in missing
+                if not any(other != vector and all(o <= v for o, v in zip(other, vector)) for other in missing)}
+        kept_throws = []
+        for cards in throws:
+            vector = cards_missing(cards)
+            if vector in best:
+                kept_throws.append(cards)
+                best.remove(vector)
+        return kept_throws
 
-    def __get_possible_build_road_moves(self, player: Player.Player, free: bool = False) -> List[Moves.BuildMove]:
-        moves = []
-        if self.__has_remaining_roads(player):
-            moves = [Moves.BuildMove(player, Consts.PurchasableType.ROAD, edge, free=free)
-                     for edge in self.__buildable_edges(player)]
-        return moves
+    def __get_possible_knight_moves(self, player: Player.Player, robber: bool = False) -> List[Moves.UseKnightDevMove]:
+        if not robber and not self.__can_use_dev(player, Consts.DevType.KNIGHT):
+            return []
+        return [Moves.UseKnightDevMove(player, hex_id, opp, robber_activated=robber)
+                for hex_id, opp in self.__knight_targets(player)]
 
     def __get_possible_build_settlement_moves(self, player: Player.Player,
                                               pre_game: bool = False) -> List[Moves.BuildMove]:
@@ -718,97 +1071,286 @@ class GameSession:
         return moves
 
     def __get_possible_moves(self, player: Player.Player) -> List[Moves.Move]:
+        moves = []
+        for move_type, subtype in MAIN_PHASE_MOVE_KINDS:
+            moves.extend(self.__gen_moves(player, move_type, subtype))
+        return moves
+
+    def __is_legal_main_phase_move(self, move: Moves.Move) -> bool:
+        player = self.__curr_player_sim
+        move_type = move.get_type()
+        if move_type == Moves.MoveType.PASS:
+            return True
+
+        elif isinstance(move, Moves.BuyDevMove):
+            return self.__can_purchase(player, Consts.PurchasableType.DEV_CARD) and self.__dev_deck.size() > 0
+
+        elif isinstance(move, Moves.UseDevMove):
+            if not self.__can_use_dev(player, move.uses()):
+                return False
+            if isinstance(move, Moves.UseKnightDevMove):
+                return not move.robber_activated() and self.__is_legal_robber_target(move)
+            elif isinstance(move, Moves.UseMonopolyDevMove):
+                return move.resource() in Consts.YIELDING_RESOURCES
+            elif isinstance(move, Moves.UseYopDevMove):
+                return (all(card in Consts.YIELDING_RESOURCES for card in move.resources()) and
+                        self.__res_deck.contains(move.resources()))
+            elif isinstance(move, Moves.UseRoadBuildingDevMove):
+                roads = tuple(move.roads())
+                if len(roads) == 2 and all(edge in self.__buildable_edges(player) for edge in roads):
+                    roads = tuple(sorted(roads))  # two roads buildable now are built in any order
+                return roads in self.__road_building_roads(player)
+            return move.uses() == Consts.DevType.VP
+
+        elif isinstance(move, Moves.BuildMove):
+            buildable = move.builds()
+            if move.is_free() or buildable not in Consts.BUILDABLES or not self.__can_purchase(player, buildable):
+                return False
+            if buildable == Consts.PurchasableType.SETTLEMENT:
+                return self.__has_remaining_settlements(player) and move.at() in self.__buildable_nodes(player)
+            elif buildable == Consts.PurchasableType.CITY:
+                return self.__has_remaining_cities(player) and move.at() in player.settlement_nodes()
+            return self.__has_remaining_roads(player) and move.at() in self.__buildable_edges(player)
+
+        elif isinstance(move, Moves.TradeMove):
+            gives, gets = move.gives(), move.gets()
+            resources_out = set(gives)
+            if len(resources_out) != 1 or gets.size() != 1:
+                return False
+            resource_out, resource_in = resources_out.pop(), next(iter(gets))
+            return self.__is_legal_trade_offer(player, resource_out, gives.size(), resource_in)
+
+        return False
+
+    def __is_legal_trade_offer(self, player: Player.Player, resource_out: Consts.ResourceType, amount_out: int,
+                               resource_in: Consts.ResourceType) -> bool:
+        if resource_in not in self.__available_resources() or resource_out not in Consts.YIELDING_RESOURCES:
+            return False
+        if not player.resource_hand().contains(Hand.Hand(*[resource_out] * amount_out)):
+            return False
+        return ((amount_out == Consts.DECK_TRADE_RATIO and resource_out != resource_in) or
+                (amount_out == Consts.GENERAL_HARBOR_TRADE_RATIO and self.__has_general_harbor(player)) or
+                (amount_out == Consts.RESOURCE_HARBOR_TRADE_RATIO and resource_out in player.harbor_resources()))
+
+    def __is_legal_robber_target(self, move: Moves.UseKnightDevMove) -> bool:
+        if not 0 <= move.hex_id() < len(self.board().hexes()):
+            return False
+        hex_tile = self.board().hexes()[move.hex_id()]
+        if hex_tile.has_robber() or hex_tile.resource() == Consts.ResourceType.DESERT:
+            return False
+        opponents_on_hex = {self.board().nodes()[node].player() for node in hex_tile.nodes()
+                            if node in self.board().nodes()} - {move.player()}
+        if opponents_on_hex:
+            return move.take_from() in opponents_on_hex
+        return move.take_from() is None
+
+    def __choose_move(self, player: Player.Player) -> Moves.Move:
+        # agents that sample their moves get only the move counts per kind, and only the move drawn is made
+        # (no move list and no copy of the state)
+        if player.agent().samples_moves():
+            move = self.possible_move_at(*player.sample(self.possible_move_counts()))
+        else:
+            budget = self.__decision_budget()  # the copy of the state counts towards the decision's time
+            move = player.choose(self.possible_moves(), deepcopy(self), budget)
+        self.__record_move(move)
+        return move
+
+    def __decision_budget(self) -> Union[Budget.Budget, None]:
+        if self.__decision_time is None and self.__decision_simulations is None:
+            return None
+        return Budget.Budget(self.__decision_time, self.__decision_simulations)
+
+    def __record_move(self, move: Moves.Move) -> None:
+        self.__move_history.append(move.key())
+        self.__num_moves_played += 1
+
+    def __print_possible_moves(self, player: Player.Player) -> None:
+        if DEBUG:
+            dprint(f'[RUN GAME] player {player} can play:\n')
+            dprint('\n'.join(m.info() for m in self.possible_moves()) + '\n')
+
+    # lazy move generation #
+    def __lazy_moves(self) -> bool:
+        # main phase moves are generated from the state on demand, any other decision lists its moves explicitly
+        return self.__phase == GamePhase.MAKE_MOVE
+
+    def __move_kinds(self) -> List[Tuple[Moves.MoveType, MoveSubtype]]:
+        if not self.__lazy_moves():
+            return list(dict.fromkeys((m.get_type(), m.subtype()) for m in self.__possible_moves_this_phase))
+        player = self.__curr_player_sim
+        return [(move_type, subtype) for move_type, subtype in MAIN_PHASE_MOVE_KINDS
+                if self.__move_options(player, move_type, subtype)]
+
+    def __gen_moves(self, player: Player.Player, move_type: Moves.MoveType,
+                    subtype: MoveSubtype = None) -> Iterator[Moves.Move]:
+        for option in self.__move_options(player, move_type, subtype):
+            yield self.__make_move(player, move_type, subtype, option)
+
+    def __move_options(self, player: Player.Player, move_type: Moves.MoveType, subtype: MoveSubtype) -> Sequence:
+        """the parameters of every possible main phase move of the given kind, moves are made from them lazily"""
+        if move_type == Moves.MoveType.PASS:
+            return NO_PARAMS
+
+        elif move_type == Moves.MoveType.BUY_DEV:
+            if self.__can_purchase(player, Consts.PurchasableType.DEV_CARD) and self.__dev_deck.size() > 0:
+                return NO_PARAMS
+
+        elif move_type == Moves.MoveType.USE_DEV:
+            if self.__can_use_dev(player, subtype):
+                if subtype == Consts.DevType.MONOPOLY:
+                    return self.__monopoly_resources(player)
+                elif subtype == Consts.DevType.YEAR_OF_PLENTY:
+                    return [resources for resources in YOP_COMBINATIONS
+                            if self.__res_deck.contains(Hand.Hand(*resources))]
+                elif subtype == Consts.DevType.KNIGHT:
+                    return self.__knight_targets(player)
+                elif subtype == Consts.DevType.ROAD_BUILDING:
+                    return self.__road_building_roads(player)
+                return NO_PARAMS
+
+        elif move_type == Moves.MoveType.BUILD:
+            if self.__can_purchase(player, subtype):
+                if subtype == Consts.PurchasableType.SETTLEMENT and self.__has_remaining_settlements(player):
+                    return self.__buildable_nodes(player)
+                elif subtype == Consts.PurchasableType.CITY and self.__has_remaining_cities(player):
+                    return player.settlement_nodes()
+                elif subtype == Consts.PurchasableType.ROAD and self.__has_remaining_roads(player):
+                    return self.__buildable_edges(player)
+
+        elif move_type == Moves.MoveType.TRADE:
+            return self.__trade_offers(player)
+
+        return ()
+
+    @staticmethod
+    def __make_move(player: Player.Player, move_type: Moves.MoveType, subtype: MoveSubtype, option) -> Moves.Move:
+        if move_type == Moves.MoveType.BUY_DEV:
+            return Moves.BuyDevMove(player)
+        elif move_type == Moves.MoveType.USE_DEV:
+            if subtype == Consts.DevType.MONOPOLY:
+                return Moves.UseMonopolyDevMove(player, option)
+            elif subtype == Consts.DevType.YEAR_OF_PLENTY:
+                return Moves.UseYopDevMove(player, *option)
+            elif subtype == Consts.DevType.ROAD_BUILDING:
+                return Moves.UseRoadBuildingDevMove(player, option)
+            elif subtype == Consts.DevType.KNIGHT:
+                hex_id, opp = option
+                return Moves.UseKnightDevMove(player, hex_id, opp)
+            return Moves.UseDevMove(player, subtype)
+        elif move_type == Moves.MoveType.BUILD:
+            return Moves.BuildMove(player, subtype, option)
+        elif move_type == Moves.MoveType.TRADE:
+            resource_out, amount_out, resource_in = option
+            return Moves.TradeMove(player, Hand.Hand(*[resource_out] * amount_out), Hand.Hand(resource_in))
+        return Moves.Move(player, move_type)
+
+    def __can_use_dev(self, player: Player.Player, dev_type: Consts.DevType) -> bool:
+        if self.__dev_used_this_turn or not player.dev_hand().contains(Hand.Hand(dev_type)):
+            return False
+        # if wasnt bought this turn or had at least 1 more from before this turn
+        return (dev_type not in self.__dev_cards_bought_this_turn or
+                player.dev_hand().cards_of_type(dev_type).size() >
+                self.__dev_cards_bought_this_turn.cards_of_type(dev_type).size())
+
+    def __knight_targets(self, player: Player.Player) -> List[Tuple[int, Union[Player.Player, None]]]:
+        return self.__cached(MoveComponent.ROBBER_TARGETS, player.get_id(), lambda: self.__find_knight_targets(player))
+
+    def __find_knight_targets(self, player: Player.Player) -> List[Tuple[int, Union[Player.Player, None]]]:
+        targets = []
+        robber_hex = self.board().robber_hex()
+        for hex_tile in self.board().hexes():  # get hex, cant place at same place or back at desert
+            if hex_tile is not robber_hex and hex_tile.resource() != Consts.ResourceType.DESERT:
+                opponents_on_hex = []  # finding opponents with buildables around hex
+                for node in hex_tile.nodes():  # get node around hex that is occupied
+                    if self.board().nodes().get(node) is not None:
+                        opp = self.board().nodes().get(node).player()
+                        if opp != player and opp not in opponents_on_hex:  # if its not occupied by you...
+                            opponents_on_hex.append(opp)  # then its an opponent
+                if opponents_on_hex:
+                    targets.extend((hex_tile.id(), opp) for opp in opponents_on_hex)
+                else:  # no opponents, make move without opp id
+                    targets.append((hex_tile.id(), None))
+        if self.__prune_moves:
+            return self.__prune_knight_targets(player, targets)
+        return targets
+
+    def __prune_knight_targets(self, player: Player.Player,
+                               targets: List[Tuple[int, Union[Player.Player, None]]]
+                               ) -> List[Tuple[int, Union[Player.Player, None]]]:
+        # a robber with no opponent to take from only blocks ourselves, if anyone. all hexes that block no one are
+        # equivalent, and hexes that block only our own buildables are dominated by them
+        empty_hexes = [hex_id for hex_id, opp in targets if opp is None]
+        neutral_hexes = [hex_id for hex_id in empty_hexes if not any(
+            node in self.board().nodes() for node in self.board().hexes()[hex_id].nodes())]
+        if not neutral_hexes:
+            return targets
+        return [(hex_id, opp) for hex_id, opp in targets if opp is not None or hex_id == neutral_hexes[0]]
+
+    def __monopoly_resources(self, player: Player.Player) -> List[Consts.ResourceType]:
+        if not self.__prune_moves:
+            return Consts.YIELDING_RESOURCES
+        # monopolies on resources no opponent may hold (as everyone sees it, the move list mustn't show hidden hands)
+        # all take nothing, a single one of them represents the rest
+        held = [resource for resource in Consts.YIELDING_RESOURCES
+                if any(opp != player and self.__card_tracker.resource_bounds(opp)[resource][1] > 0
+                       for opp in self.players())]
+        not_held = [resource for resource in Consts.YIELDING_RESOURCES if resource not in held]
+        return [resource for resource in Consts.YIELDING_RESOURCES if resource in held or resource in not_held[:1]]
+
+    def __trade_offers(self, player: Player.Player) -> List[Tuple[Consts.ResourceType, int, Consts.ResourceType]]:
+        """(resource given, amount given, resource received) of every possible trade"""
+        return self.__cached(MoveComponent.TRADE_OFFERS, player.get_id(), lambda: self.__find_trade_offers(player))
+
+    def __find_trade_offers(self, player: Player.Player) -> List[Tuple[Consts.ResourceType, int, Consts.ResourceType]]:
+        offers = []
+        available_resources = self.__available_resources()
 
-        # PASS TURN #
-        moves = [Moves.Move(player, Moves.MoveType.PASS)]
-
-        # BUY #
-        # Buy Dev Move Legality
-        if (self.__can_purchase(player, Consts.PurchasableType.DEV_CARD) and
-                self.__dev_deck.size() > 0):
-            moves.append(Moves.BuyDevMove(player))
-
-        # USE #
-        # Use Dev Card Legality
-        if not self.__dev_used_this_turn:
-            for dev_type in Consts.DevType:  # get dev card type
-                if player.dev_hand().contains(Hand.Hand(dev_type)):  # if has it
-                    # if wasnt bought this turn or had at least 1 more from before this turn
-                    if (dev_type not in self.__dev_cards_bought_this_turn or
-                            player.dev_hand().cards_of_type(dev_type).size() >
-                            self.__dev_cards_bought_this_turn.cards_of_type(dev_type).size()):
-                        if dev_type == Consts.DevType.MONOPOLY:
-                            for resource in Consts.YIELDING_RESOURCES:
-                                moves.append(Moves.UseMonopolyDevMove(player, resource))
-                        elif dev_type == Consts.DevType.YEAR_OF_PLENTY:
-                            for resource_comb in combinations(Consts.YIELDING_RESOURCES, Consts.YOP_NUM_RESOURCES):
-                                moves.append(Moves.UseYopDevMove(player, *resource_comb))
-                        elif dev_type == Consts.DevType.ROAD_BUILDING:
-                            moves.append(Moves.UseRoadBuildingDevMove(player))
-                        elif dev_type == Consts.DevType.KNIGHT:
-                            robber_hex = self.board().robber_hex()
-                            for hex_tile in self.board().hexes():
-                                if hex_tile is not robber_hex and hex_tile.resource() != Consts.ResourceType.DESERT:
-                                    opponents_on_hex = set()
-                                    for node in hex_tile.nodes():
-                                        if self.board().nodes().get(node) is not None:
-                                            opp = self.board().nodes().get(node).player()
-                                            if opp != player:
-                                                opponents_on_hex.add(opp)
-                                    if opponents_on_hex:
-                                        for opp in opponents_on_hex:
-                                            moves.append(Moves.UseKnightDevMove(player, hex_tile.id(), opp))
-                                    else:
-                                        moves.append(Moves.UseKnightDevMove(player, hex_tile.id(), None))
-
-                        elif dev_type == Consts.DevType.VP:
-                            moves.append(Moves.UseDevMove(player, dev_type))
-
-        # BUILD #
-        # Build settlement legality
-        if (self.__can_purchase(player, Consts.PurchasableType.SETTLEMENT) and
-                self.__has_remaining_settlements(player)):
-            for node in self.__buildable_nodes(player):
-                moves.append(Moves.BuildMove(player, Consts.PurchasableType.SETTLEMENT, node))
-
-        # build city legality
-        if (self.__can_purchase(player, Consts.PurchasableType.CITY) and
-                self.__has_remaining_cities(player)):
-            for settlement_node in player.settlement_nodes():
-                moves.append(Moves.BuildMove(player, Consts.PurchasableType.CITY, settlement_node))
-
-        # build road legality
-        if (self.__can_purchase(player, Consts.PurchasableType.ROAD) and
-                self.__has_remaining_roads(player)):
-            for edge_id in self.__buildable_edges(player):
-                moves.append(Moves.BuildMove(player, Consts.PurchasableType.ROAD, edge_id))
-
-        # TRADE #
         # trade legality with deck
         for homogeneous_hand in self.__homogeneous_hands_of_size(player, Consts.DECK_TRADE_RATIO):
-            for available_resource in self.__available_resources():
-                if [card for card in homogeneous_hand][0] != available_resource:
-                    moves.append(Moves.TradeMove(player, homogeneous_hand, Hand.Hand(available_resource)))
+            resource_out = [card for card in homogeneous_hand][0]
+            for available_resource in available_resources:
+                if resource_out != available_resource:
+                    offers.append((resource_out, Consts.DECK_TRADE_RATIO, available_resource))
 
         # trade legality with general harbor
         if self.__has_general_harbor(player):
             for homogeneous_hand in self.__homogeneous_hands_of_size(player, Consts.GENERAL_HARBOR_TRADE_RATIO):
-                for available_resource in self.__available_resources():
-                    moves.append(Moves.TradeMove(player, homogeneous_hand, Hand.Hand(available_resource)))
+                resource_out = [card for card in homogeneous_hand][0]
+                for available_resource in available_resources:
+                    offers.append((resource_out, Consts.GENERAL_HARBOR_TRADE_RATIO, available_resource))
 
         # trade legality with resource harbor
         for resource in player.harbor_resources():
             cards_out = Hand.Hand(*[resource for _ in range(Consts.RESOURCE_HARBOR_TRADE_RATIO)])
             if player.resource_hand().contains(cards_out):
-                for available_resource in self.__available_resources():
-                    moves.append(Moves.TradeMove(player, cards_out, Hand.Hand(available_resource)))
+                for available_resource in available_resources:
+                    offers.append((resource, Consts.RESOURCE_HARBOR_TRADE_RATIO, available_resource))
 
-        return moves
+        if self.__prune_moves:
+            return self.__prune_trade_offers(offers)
+        return offers
+
+    @staticmethod
+    def __prune_trade_offers(offers: List[Tuple[Consts.ResourceType, int, Consts.ResourceType]]
+                             ) -> List[Tuple[Consts.ResourceType, int, Consts.ResourceType]]:
+        # a trade is dominated by the same trade at a better (harbor) rate,
+        # and trading a resource for itself only loses cards
+        best_amounts = {}
+        for resource_out, amount_out, resource_in in offers:
+            if resource_out != resource_in:
+                best = best_amounts.get((resource_out, resource_in), amount_out)
+                best_amounts[(resource_out, resource_in)] = min(best, amount_out)
+        return [(resource_out, amount_out, resource_in) for resource_out, amount_out, resource_in in offers
+                if resource_out != resource_in and amount_out == best_amounts[(resource_out, resource_in)]]
 
     def __buildable_nodes(self, player: Player.Player, pre_game: bool = False) -> List[int]:
+        return self.__cached(MoveComponent.BUILDABLE_NODES, (player.get_id(), pre_game),
+                             lambda: self.__find_buildable_nodes(player, pre_game))
+
+    def __find_buildable_nodes(self, player: Player.Player, pre_game: bool = False) -> List[int]:
         player_nodes = set()
         if pre_game:
-            return [node for node in hexgrid.legal_node_coords() if self.__is_distant_node(node)]
+            return [node for node in Board.LEGAL_NODES if self.__is_distant_node(node)]
         else:
             for edge_id in player.road_edges():
                 for node in hexgrid.nodes_touching_edge(edge_id):
@@ -817,6 +1359,9 @@ class GameSession:
             return [node for node in player_nodes if self.__is_distant_node(node)]
 
     def __buildable_edges(self, player: Player.Player) -> List[int]:
+        return self.__cached(MoveComponent.BUILDABLE_EDGES, player.get_id(), lambda: self.__find_buildable_edges(player))
+
+    def __find_buildable_edges(self, player: Player.Player) -> List[int]:
         player_nodes = set()
         for road_edge in player.road_edges():
             for node in hexgrid.nodes_touching_edge(road_edge):
@@ -833,7 +1378,7 @@ class GameSession:
 
         to_remove = []
         for edge in adj_edges:
-            if edge not in hexgrid.legal_edge_coords() or self.board().edges().get(edge) is not None:
+            if edge not in Board.LEGAL_EDGES or self.board().edges().get(edge) is not None:
                 to_remove.append(edge)
 
         for edge in to_remove:
@@ -841,6 +1386,30 @@ class GameSession:
 
         return list(adj_edges)
 
+    def __road_building_roads(self, player: Player.Player) -> List[Tuple[int, ...]]:
+        """the roads of every distinct Road Building: unordered pairs of edges (a second edge may connect through
+        the first), single edges if only one road can be built, and no edges if none can"""
+        return self.__cached(MoveComponent.ROAD_BUILDING_ROADS, player.get_id(),
+                             lambda: self.__find_road_building_roads(player))
+
+    def __find_road_building_roads(self, player: Player.Player) -> List[Tuple[int, ...]]:
+        num_roads = min(Consts.ROAD_BUILDING_NUM_ROADS, Consts.MAX_ROADS_PER_PLAYER - player.num_roads())
+        first_edges = self.__buildable_edges(player) if num_roads > 0 else []
+        if num_roads < 2 or not first_edges:
+            return [(edge,) for edge in first_edges] or [()]
+
+        roads = []
+        for first_edge in first_edges:
+            # edges connected through the first one, roads made of two edges buildable now are ordered by edge
+            second_edges = {edge for node in hexgrid.nodes_touching_edge(first_edge)
+                            for edge in self.board().get_adj_edges_to_node(node)
+                            if edge in Board.LEGAL_EDGES and edge not in self.board().edges()}
+            second_edges.update(first_edges)
+            second_edges.discard(first_edge)
+            roads.extend((first_edge, second_edge) for second_edge in sorted(second_edges)
+                         if second_edge not in first_edges or first_edge < second_edge)
+        return roads or [(edge,) for edge in first_edges]
+
     def __is_distant_node(self, node_id: int) -> bool:
         adj_nodes = self.__board.get_adj_nodes_to_node(node_id) + [node_id]
         return all(self.__board.nodes().get(adj) is None for adj in adj_nodes)
@@ -872,7 +1441,7 @@ class GameSession:
         self.__pre_game_settlement_node = settlement_node
         settlement = Buildable.Buildable(curr_player, settlement_node, Consts.PurchasableType.SETTLEMENT)
         curr_player.add_buildable(settlement)
-        self.__board.build(settlement)
+        self.__build(settlement)
 
         dprint(self.board())
 
@@ -894,12 +1463,14 @@ class GameSession:
         road_edge = build_adj_road_move.at()
         road = Buildable.Buildable(curr_player, road_edge, Consts.PurchasableType.ROAD)
         curr_player.add_buildable(road)
-        self.__board.build(road)
+        self.__build(road)
 
         if _round == 2:  # second round, yield resources from settlement
             starting_resources = self.__board.resource_distributions_by_node(settlement_node)
             self.__res_deck.remove(starting_resources)
             curr_player.receive_cards(starting_resources)
+            self.__card_tracker.gain(curr_player, starting_resources)
+            self.__invalidate(*HAND_COMPONENTS)
 
         # new - update round and player
         if _round == 1:
@@ -923,7 +1494,7 @@ class GameSession:
         self.__possible_moves_this_phase = settlement_moves
         return self.__possible_moves_this_phase
 
-    def __main_game_sim(self) -> List[Moves.Move]:
+    def __main_game_sim(self) -> Union[List[Moves.Move], None]:
         curr_player = self.__curr_player_sim
         self.__dev_used_this_turn = False
         self.__dev_cards_bought_this_turn = Hand.Hand()  # to know if player can use a dev card
@@ -954,15 +1525,15 @@ class GameSession:
             for player, hand in dist.items():
                 removed = self.__res_deck.remove_as_much(hand)
                 player.receive_cards(removed)
+                self.__card_tracker.gain(player, removed)
                 dprint(f'[RUN GAME] player {player} received {removed}, '
                        f'now has {player.resource_hand()}')
+            self.__invalidate(*HAND_COMPONENTS)
 
         # query player for move #
         self.__phase = GamePhase.MAKE_MOVE
-        moves_available = self.__get_possible_moves(curr_player)
-        dprint(f'[RUN GAME] player {curr_player} can play:\n')
-        dprint('\n'.join(m.info() for m in moves_available) + '\n')
-        self.__possible_moves_this_phase = moves_available
+        self.__possible_moves_this_phase = None
+        self.__print_possible_moves(curr_player)
         return self.__possible_moves_this_phase
 
     def __robber_throw_sim(self, move_to_play: Moves.ThrowMove) -> List[Moves.Move]:
@@ -971,22 +1542,20 @@ class GameSession:
 
         cards_thrown = throw_move.throws()
         player.throw_cards(cards_thrown)
+        self.__card_tracker.lose(player, cards_thrown)
         self.__res_deck.insert(cards_thrown)
-        if player.resource_hand().size() > self.__throw_player_hand_size:
-            self.__possible_moves_this_phase = self.__get_possible_throw_moves(player)
-            return self.__possible_moves_this_phase
-        else:
-            next_player_idx = self.players().index(player) + 1
-            while next_player_idx < len(self.players()):
-                next_player = self.players()[next_player_idx]
-                next_player_hand_size = next_player.resource_hand().size()
-                if next_player_hand_size > Consts.MAX_CARDS_IN_HAND:
-                    self.__throw_player = next_player
-                    self.__throw_player_hand_size = next_player_hand_size - (next_player_hand_size // 2)
-                    self.__possible_moves_this_phase = self.__get_possible_throw_moves(self.__throw_player)
-                    return self.__possible_moves_this_phase
-                else:
-                    next_player_idx += 1
+        self.__invalidate(*HAND_COMPONENTS)
+        next_player_idx = self.players().index(player) + 1
+        while next_player_idx < len(self.players()):
+            next_player = self.players()[next_player_idx]
+            next_player_hand_size = next_player.resource_hand().size()
+            if next_player_hand_size > Consts.MAX_CARDS_IN_HAND:
+                self.__throw_player = next_player
+                self.__throw_player_hand_size = next_player_hand_size - (next_player_hand_size // 2)
+                self.__possible_moves_this_phase = self.__get_possible_throw_moves(self.__throw_player)
+                return self.__possible_moves_this_phase
+            else:
+                next_player_idx += 1
 
         # move robber
         self.__phase = GamePhase.ROBBER_PLACE
@@ -994,7 +1563,7 @@ class GameSession:
         self.__possible_moves_this_phase = knight_moves
         return self.__possible_moves_this_phase
 
-    def __robber_place_sim(self, move: Moves.UseKnightDevMove) -> List[Moves.Move]:
+    def __robber_place_sim(self, move: Moves.UseKnightDevMove) -> Union[List[Moves.Move], None]:
         knight_move = move
         curr_player = self.__curr_player_sim
 
@@ -1004,11 +1573,10 @@ class GameSession:
 
         # query player for move #
         self.__phase = GamePhase.MAKE_MOVE
-        moves_available = self.__get_possible_moves(curr_player)
-        self.__possible_moves_this_phase = moves_available
+        self.__possible_moves_this_phase = None
         return self.__possible_moves_this_phase
 
-    def __make_move_sim(self, move_to_play: Moves.Move) -> List[Moves.Move]:
+    def __make_move_sim(self, move_to_play: Moves.Move) -> Union[List[Moves.Move], None]:
         curr_player = self.__curr_player_sim
 
         vp_before = curr_player.vp()
@@ -1017,11 +1585,13 @@ class GameSession:
         self.__vp_earned_this_phase = vp_after - vp_before
 
         if move_to_play.get_type() != Moves.MoveType.PASS:
-            moves_available = self.__get_possible_moves(curr_player)
-            self.__possible_moves_this_phase = moves_available
+            self.__possible_moves_this_phase = None
             return self.__possible_moves_this_phase
+        return self.__end_turn_sim()
 
-        elif self.is_game_over():
+    def __end_turn_sim(self) -> Union[List[Moves.Move], None]:
+        curr_player = self.__curr_player_sim
+        if self.is_game_over():
             self.__phase = GamePhase.GAME_OVER
             dprint(f'\n\n\nGAME OVER - player {curr_player} won!!!')
             self.__possible_moves_this_phase = []
@@ -1031,6 +1601,71 @@ class GameSession:
             self.__curr_player_sim = self.players()[next_player_idx]
             return self.__main_game_sim()
 
+    # fast forward #
+    def __fast_forward_throws(self) -> None:
+        # every player from the current thrower on throws random cards down to the hand limit
+        first_thrower_idx = self.players().index(self.__throw_player)
+        for player in self.players()[first_thrower_idx:]:
+            hand_size = player.resource_hand_size()
+            if player == self.__throw_player:
+                target_size = self.__throw_player_hand_size
+            else:
+                target_size = hand_size - (hand_size // 2) if hand_size > Consts.MAX_CARDS_IN_HAND else hand_size
+            while player.resource_hand_size() > target_size:
+                card = player.resource_hand().remove_random_card()
+                self.__card_tracker.lose(player, card)
+                self.__res_deck.insert(card)
+        self.__invalidate(*HAND_COMPONENTS)
+
+    def __fast_forward_robber(self) -> None:
+        curr_player = self.__curr_player_sim
+        hex_id, opp = choice(self.__knight_targets(curr_player))
+        self.__robber_protocol(curr_player, hex_id, opp, printout=False)
+
+    def __fast_forward_builds(self) -> None:
+        # greedily builds cities, then settlements, then a single road, on random spots
+        player = self.__curr_player_sim
+        roads_built = 0
+        road_lens_changed = False
+        for buildable_type in FAST_FORWARD_BUILDS:
+            while self.__can_purchase(player, buildable_type):
+                if buildable_type == Consts.PurchasableType.CITY and self.__has_remaining_cities(player):
+                    spots = player.settlement_nodes()
+                elif buildable_type == Consts.PurchasableType.SETTLEMENT and self.__has_remaining_settlements(player):
+                    spots = self.__buildable_nodes(player)
+                elif (buildable_type == Consts.PurchasableType.ROAD and self.__has_remaining_roads(player) and
+                      roads_built < FAST_FORWARD_MAX_ROADS):
+                    spots = self.__buildable_edges(player)
+                else:
+                    break
+                if not spots:
+                    break
+
+                spot = choice(spots)
+                if buildable_type == Consts.PurchasableType.CITY:
+                    del self.board().nodes()[spot]
+                    player.remove_settlement(spot)
+                cost = Consts.COSTS[buildable_type]
+                player.throw_cards(cost)
+                self.__card_tracker.lose(player, cost)
+                self.__res_deck.insert(cost)
+                self.__invalidate(*HAND_COMPONENTS)
+                buildable = Buildable.Buildable(player, spot, buildable_type)
+                player.add_buildable(buildable)
+                self.__build(buildable)
+                if buildable_type == Consts.PurchasableType.ROAD:
+                    roads_built += 1
+                road_lens_changed |= buildable_type != Consts.PurchasableType.CITY
+
+        if road_lens_changed:
+            self.__update_longest_road()
+
+    def __update_longest_road(self) -> None:
+        # reassigns the longest road, after a build that lengthened or cut a road
+        longest_road_player = self.longest_road_player()
+        for player in self.players():
+            player.set_longest_road(player == longest_road_player)
+
 
 def dprint(*args, **kwargs):
     """a debug printer"""
@@ -2,7 +2,7 @@ from __future__ import annotations  # for Hand type hints inside Hand
 from typing import Type, Union
 import GameConstants as Consts
 from collections import defaultdict
-from random import choice
+from GameRandom import choice
 
 
 class Hand:
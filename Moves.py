@@ -3,7 +3,7 @@ import GameConstants as Consts
 import Player
 import Hand
 from enum import Enum
-from typing import Union
+from typing import Union, Tuple
 
 
 class MoveType(Enum):
@@ -37,10 +37,18 @@ class Move:
         """:returns the type of move as a MoveType enum"""
         return self.__type
 
+    def subtype(self) -> Union[Consts.PurchasableType, Consts.DevType, None]:
+        """:returns the finer grained kind of this move within its MoveType (e.g. the buildable built), if any"""
+        return None
+
     def info(self) -> str:
         """:returns an informative string about this move"""
         return f'[MOVE] player = {self.player()}, type = {self.get_type().name}'
 
+    def key(self) -> Tuple:
+        """:returns a hashable identity of this move, equal for moves that do the same (e.g. across game copies)"""
+        return self.player().get_id(), self.get_type()
+
     def __str__(self) -> str:
         return str(self.__type)
 
@@ -65,6 +73,9 @@ class TradeMove(Move):
         return f'[MOVE] player = {self.player()}, ' \
                f'type = {self.get_type().name}, gives = {self.gives()}, gets = {self.gets()}'
 
+    def key(self) -> Tuple:
+        return super().key() + (cards_key(self.gives()), cards_key(self.gets()))
+
 
 class BuyDevMove(Move):
     """A Move that buys a development card"""
@@ -82,15 +93,36 @@ class UseDevMove(Move):
         """:returns the dev card to be used as a DevType enum"""
         return self.__dev_to_use
 
+    def subtype(self) -> Consts.DevType:
+        """:returns the dev card to be used as a DevType enum"""
+        return self.uses()
+
     def info(self) -> str:
         """:returns an informative string about this Use Dev card move"""
         return f'[MOVE] player = {self.player()}, type = {self.get_type().name}, uses = {self.uses().name}'
 
+    def key(self) -> Tuple:
+        return super().key() + (self.uses(),)
+
 
 class UseRoadBuildingDevMove(UseDevMove):
-    """A Move that uses a Road Building Development Card"""
-    def __init__(self, player: Player):
+    """A Move that uses a Road Building Development Card, with the free roads it builds"""
+    def __init__(self, player: Player, edges: Tuple[int, ...] = ()):
         super().__init__(player, Consts.DevType.ROAD_BUILDING)
+        self.__edges = tuple(edges)
+
+    def roads(self) -> Tuple[int, ...]:
+        """:returns the edges (see HexGrid) to build the free roads on, in the order they're built (an edge may
+        only connect to the roads through the one before it)"""
+        return self.__edges
+
+    def info(self) -> str:
+        """:returns an informative string about this Road Building move"""
+        return f'[MOVE] player = {self.player()}, type = {self.get_type().name}, uses = {self.uses().name}, ' \
+               f'roads at = {[hex(edge) for edge in self.roads()]}'
+
+    def key(self) -> Tuple:
+        return super().key() + (self.roads(),)
 
 
 class UseYopDevMove(UseDevMove):
@@ -103,6 +135,9 @@ class UseYopDevMove(UseDevMove):
     def resources(self) -> Hand:
         return self.__resources
 
+    def key(self) -> Tuple:
+        return super().key() + (cards_key(self.resources()),)
+
 
 class UseMonopolyDevMove(UseDevMove):
     """A Move that uses a Monopoly Development Card"""
@@ -113,6 +148,9 @@ class UseMonopolyDevMove(UseDevMove):
     def resource(self) -> Consts.ResourceType:
         return self.__resource
 
+    def key(self) -> Tuple:
+        return super().key() + (self.resource(),)
+
 
 class UseKnightDevMove(UseDevMove):
     """A Move that uses a Knight Development Card / displaces the Robber when activated"""
@@ -141,6 +179,10 @@ class UseKnightDevMove(UseDevMove):
                f'type = {self.get_type().name}, ' \
                f'places robber at hex = {self.hex_id()}, takes card from = {self.take_from()}'
 
+    def key(self) -> Tuple:
+        opp_id = self.take_from().get_id() if self.take_from() is not None else None
+        return super().key() + (self.hex_id(), opp_id, self.robber_activated())
+
 
 class ThrowMove(Move):
     """A Move that throws a card from the player's hand"""
@@ -159,6 +201,9 @@ class ThrowMove(Move):
     def info(self) -> str:
         return f'[MOVE] player = {self.player()}, type = {self.get_type()}, throws = {self.throws()}'
 
+    def key(self) -> Tuple:
+        return super().key() + (cards_key(self.throws()),)
+
 
 class BuildMove(Move):
     """A Move that builds a Buildable on the board"""
@@ -176,6 +221,10 @@ class BuildMove(Move):
         """:returns the building type as a PurchasableType enum"""
         return self.__to_build
 
+    def subtype(self) -> Consts.PurchasableType:
+        """:returns the building type as a PurchasableType enum"""
+        return self.builds()
+
     def at(self) -> int:
         """:returns int value of node / edge idx of location to build on the board (see HexGrid)"""
         return self.__loc
@@ -184,3 +233,11 @@ class BuildMove(Move):
         """:returns an informative string about this build move"""
         return f'[MOVE] player = {self.player()}, ' \
                f'type = {self.get_type().name}, builds = {self.builds().name}, at = {hex(self.at())}'
+
+    def key(self) -> Tuple:
+        return super().key() + (self.builds(), self.at(), self.is_free())
+
+
+def cards_key(cards: Hand) -> Tuple[str, ...]:
+    """:returns a hashable, order independent identity of the cards in a hand"""
+    return tuple(sorted(card.name for card in cards))
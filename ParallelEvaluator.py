@@ -0,0 +1,92 @@
+from __future__ import annotations
+from typing import List, Callable, Sequence
+import multiprocessing
+import GameRandom
+import GameSession
+import Moves
+from Budget import Budget
+
+"""
+A module for evaluating the candidate moves of a decision concurrently, on a pool of worker processes that is kept
+warm between decisions. Every candidate is simulated under a seed of its own, so its value doesn't depend on which
+worker (if any) evaluates it - parallel and serial evaluation give identical values.
+"""
+
+MoveValue = Callable[['GameSession.GameSession', Moves.Move], float]
+MIN_MOVES_PER_WORKER = 4  # fewer moves than that aren't worth shipping the game state to a worker
+
+
+def evaluate_moves(state: GameSession.GameSession, moves: Sequence[Moves.Move], move_value: MoveValue,
+                   seeds: Sequence[int]) -> List[float]:
+    """:returns the values of moves in state, every move simulated under its respective seed.
+    the random state of the calling thread is left as it was (see GameRandom)"""
+    rand_state = GameRandom.getstate()
+    values = []
+    for move, seed in zip(moves, seeds):
+        GameRandom.seed(seed)
+        values.append(move_value(state, move))
+    GameRandom.setstate(rand_state)
+    return values
+
+
+class ParallelEvaluator:
+    """Evaluates candidate moves on a pool of warm worker processes (or serially, with no workers)"""
+    def __init__(self, num_workers: int = 0):
+        self.__num_workers = num_workers
+        self.__pool = None
+
+    def num_workers(self) -> int:
+        """:returns the number of worker processes evaluating moves, 0 if moves are evaluated serially"""
+        return self.__num_workers
+
+    def evaluate(self, state: GameSession.GameSession, moves: Sequence[Moves.Move],
+                 move_value: MoveValue, budget: Budget = None) -> List[float]:
+        """:returns move_value(state, move) of every move, in the order of moves. move_value has to be picklable
+        (i.e. a module level function or a method of a picklable object).
+        with a budget, moves are evaluated in order (a batch per worker round) until it's spent, but one move
+        at least. the moves left unevaluated get -inf, every evaluation counts as a simulation"""
+        base_seed = GameRandom.getrandbits(32)
+        seeds = [base_seed + i for i in range(len(moves))]
+        if budget is None:
+            return self.__evaluate(state, moves, move_value, seeds)
+
+        batch_size = self.__num_workers * MIN_MOVES_PER_WORKER if self.__num_workers > 1 else 1
+        values = []
+        while len(values) < len(moves) and not (values and budget.expired()):
+            batch = slice(len(values), len(values) + batch_size)
+            values.extend(self.__evaluate(state, moves[batch], move_value, seeds[batch]))
+            budget.spend(len(moves[batch]))
+        return values + [-float('inf')] * (len(moves) - len(values))
+
+    def close(self) -> None:
+        """shuts the worker processes down, they are restarted on the next parallel evaluation"""
+        if self.__pool is not None:
+            self.__pool.terminate()
+            self.__pool = None
+
+    def __evaluate(self, state: GameSession.GameSession, moves: Sequence[Moves.Move], move_value: MoveValue,
+                   seeds: Sequence[int]) -> List[float]:
+        num_chunks = min(self.__num_workers, len(moves) // MIN_MOVES_PER_WORKER)
+        if num_chunks < 2:
+            return evaluate_moves(state, moves, move_value, seeds)
+
+        # contiguous chunks, so the game state is shipped to every worker once per decision
+        bounds = [len(moves) * i // num_chunks for i in range(num_chunks + 1)]
+        chunks = [(state, moves[start:end], move_value, seeds[start:end])
+                  for start, end in zip(bounds[:-1], bounds[1:])]
+        return [value for chunk_values in self.__get_pool().starmap(evaluate_moves, chunks)
+                for value in chunk_values]
+
+    def __get_pool(self) -> multiprocessing.pool.Pool:
+        if self.__pool is None:
+            # forked workers share the hash seed of this process, so sets of the game state iterate the same there
+            start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+            self.__pool = multiprocessing.get_context(start_method).Pool(self.__num_workers)
+        return self.__pool
+
+    def __getstate__(self):
+        # copies (i.e. inside copied game states, or sent to the workers) evaluate serially in their own process
+        state = self.__dict__.copy()
+        state['_ParallelEvaluator__num_workers'] = 0
+        state['_ParallelEvaluator__pool'] = None
+        return state
@@ -0,0 +1,130 @@
+from __future__ import annotations
+from typing import Dict, Tuple, List
+from math import ceil
+from collections import OrderedDict
+import io
+import multiprocessing
+import pickle
+import GameRandom
+import Agent
+import GameSession
+from Budget import Budget
+
+"""
+A module for root parallel tree search: several warm worker processes search the same root state with independent
+random seeds, and their root statistics are merged. The root state is sent to the workers compactly, pickled once
+per decision without the agents attached to its players. A worker keeps a context of its own for every seat it
+searches for (the least recently searched ones are dropped past MAX_WORKER_CONTEXTS, and a seat's is dropped
+once its game is over, see RootParallelSearch.release), so one searching agent can serve several seats and games.
+"""
+
+RootStats = Dict[Tuple, Tuple[int, float]]  # move key -> (visits, total value)
+MAX_WORKER_CONTEXTS = 32  # contexts a worker keeps, the least recently searched ones are dropped first
+
+_worker_searcher = None  # the searching agent of a worker process
+_worker_contexts = OrderedDict()  # seat's context key -> the worker's context of it, least recently searched first
+
+
+def dumps_state(state: GameSession.GameSession) -> bytes:
+    """:returns state pickled without the agents of its players (see loads_state)"""
+    buffer = io.BytesIO()
+    _StatePickler(buffer, pickle.HIGHEST_PROTOCOL).dump(state)
+    return buffer.getvalue()
+
+
+def loads_state(state_bytes: bytes) -> GameSession.GameSession:
+    """:returns the state pickled by dumps_state, its players play randomly (as agents inside searches do)"""
+    return _StateUnpickler(io.BytesIO(state_bytes)).load()
+
+
+def merge_root_stats(all_stats: List[RootStats]) -> RootStats:
+    """:returns the root statistics of several searches summed by move"""
+    merged = {}
+    for stats in all_stats:
+        for move_key, (visits, total_value) in stats.items():
+            merged_visits, merged_value = merged.get(move_key, (0, 0.0))
+            merged[move_key] = (merged_visits + visits, merged_value + total_value)
+    return merged
+
+
+def init_worker(searcher: Agent.Agent) -> None:
+    """initializes a worker process with its own copy of the searching agent, kept for all its searches"""
+    global _worker_searcher
+    _worker_searcher = searcher
+
+
+def search_worker(state_bytes: bytes, context_key: str, seed: int, num_iters: int,
+                  time_limit: float = None) -> RootStats:
+    """searches the root state in a worker process (for time_limit seconds at most, if given), in the worker's
+    context of the seat with context_key. :returns its root statistics"""
+    GameRandom.seed(seed)
+    budget = Budget(time_limit) if time_limit is not None else None
+    context = _worker_contexts.pop(context_key, None)
+    _worker_contexts[context_key] = context if context is not None else Agent.AgentContext()
+    while len(_worker_contexts) > MAX_WORKER_CONTEXTS:
+        _worker_contexts.popitem(last=False)
+    return _worker_searcher.search(loads_state(state_bytes), _worker_contexts[context_key], num_iters, budget)
+
+
+def release_worker(context_key: str) -> None:
+    """drops the worker's context of the seat with context_key, if it keeps one"""
+    _worker_contexts.pop(context_key, None)
+
+
+class RootParallelSearch:
+    """Runs the search of a tree search agent (an agent with search(state, context, num_iters, budget) -> RootStats)
+    from the same root on several warm worker processes. Every worker keeps its own copy of the agent and its own
+    contexts, hence its own trees"""
+    def __init__(self, searcher: Agent.Agent, num_workers: int):
+        self.__searcher = searcher
+        self.__num_workers = num_workers
+        self.__pools = None
+
+    def search(self, state: GameSession.GameSession, context: Agent.AgentContext, num_iters: int = None,
+               time_limit: float = None) -> RootStats:
+        """searches state for the seat of context on every worker, the workers share num_iters (None for their time
+        limit only), and every one of them searches for time_limit seconds at most, if given.
+        :returns the merged root statistics"""
+        state_bytes = dumps_state(state)
+        worker_iters = ceil(num_iters / self.__num_workers) if num_iters is not None else None
+        results = [pool.apply_async(search_worker, (state_bytes, context.key(), GameRandom.getrandbits(32),
+                                                    worker_iters, time_limit))
+                   for pool in self.__get_pools()]
+        return merge_root_stats([result.get() for result in results])
+
+    def release(self, context: Agent.AgentContext) -> None:
+        """drops every worker's context of the seat of context (call once its game is over)"""
+        results = [pool.apply_async(release_worker, (context.key(),)) for pool in self.__pools or ()]
+        for result in results:
+            result.get()
+
+    def close(self) -> None:
+        """shuts the worker processes down, they are restarted on the next search"""
+        for pool in self.__pools or ():
+            pool.terminate()
+        self.__pools = None
+
+    def __get_pools(self) -> List[multiprocessing.pool.Pool]:
+        # a pool of one per worker, so every search of a worker continues its own tree
+        if self.__pools is None:
+            start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+            context = multiprocessing.get_context(start_method)
+            self.__pools = [context.Pool(1, initializer=init_worker, initargs=(self.__searcher,))
+                            for _ in range(self.__num_workers)]
+        return self.__pools
+
+    def __getstate__(self):
+        # copies (i.e. the ones sent to the workers) don't own the worker processes
+        state = self.__dict__.copy()
+        state['_RootParallelSearch__pools'] = None
+        return state
+
+
+class _StatePickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        return 'agent' if isinstance(obj, Agent.Agent) else None
+
+
+class _StateUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        return Agent.RandomAgent()
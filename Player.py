@@ -1,11 +1,12 @@
 from __future__ import annotations
-from typing import Set, List, Tuple
+from typing import Set, List, Tuple, Dict
 import Buildable
 import Hand
 import Moves
 import GameConstants as Consts
 import GameSession
 import Agent
+import Budget
 
 
 class Player:
@@ -13,12 +14,11 @@ class Player:
     Class represents a player in the game,
     and holds the info of the current player
     """
-    ID_GEN = 0
-
     def __init__(self, agent: Agent.Agent, name: str = None):
         self.__agent = agent
-        self.__id = self.__gen_id()
-        self.__name = self.__gen_name(name)
+        self.__agent_context = Agent.AgentContext()
+        self.__id = None  # set by the game session the player joins
+        self.__name = name
         self.__resources_hand = Hand.Hand()
         self.__devs_hand = Hand.Hand()
         self.__used_devs = Hand.Hand()
@@ -59,6 +59,15 @@ class Player:
         """
         return self.__agent
 
+    def agent_context(self) -> Agent.AgentContext:
+        """
+        :return: the context the agent keeps its state in between the decisions of this player's seat
+        (see Agent.AgentContext)
+        """
+        if self.__agent_context is None:
+            self.__agent_context = Agent.AgentContext()
+        return self.__agent_context
+
     def remove_settlement(self, node: int) -> None:
         """
         removes a settlement from the player's settlements
@@ -101,7 +110,7 @@ class Player:
 
     def get_id(self) -> int:
         """
-        :return: this player's player id
+        :return: this player's player id, unique among the players of its game session
         """
         return self.__id
 
@@ -133,17 +142,13 @@ class Player:
         """
         :return: current number of settlements player has on the board (0-5)
         """
-        num_settles = len(self.__settlement_nodes)
-        assert 0 <= num_settles <= Consts.MAX_SETTLEMENTS_PER_PLAYER
-        return num_settles
+        return len(self.__settlement_nodes)
 
     def num_cities(self) -> int:
         """
         :return: current number of cities player has on the board (0-4)
         """
-        num_cities = len(self.__city_nodes)
-        assert 0 <= num_cities <= Consts.MAX_CITIES_PER_PLAYER
-        return num_cities
+        return len(self.__city_nodes)
 
     def harbors(self) -> List[Consts.ResourceType]:
         """
@@ -162,9 +167,7 @@ class Player:
         """
         :return: current number of roads player has on the board (0-15)
         """
-        num_roads = len(self.__road_edges)
-        assert 0 <= num_roads <= Consts.MAX_ROADS_PER_PLAYER
-        return num_roads
+        return len(self.__road_edges)
 
     def army_size(self) -> int:
         """
@@ -185,16 +188,6 @@ class Player:
         """
         return len(self.__devs_hand)
 
-    def __gen_name(self, name: str) -> str:
-        if name is None:
-            return f'Player{self.get_id()}'
-        return name
-
-    @staticmethod
-    def __gen_id() -> int:
-        Player.ID_GEN += 1
-        return Player.ID_GEN
-
     def info(self) -> str:
         """
         supplies important information about the current state of the player
@@ -216,6 +209,10 @@ class Player:
                f'[PLAYER {self}] devs_used = {self.__used_devs}\n'
 
     # modifiers #
+    def set_id(self, player_id: int) -> None:
+        """sets this player's player id, by the game session it joins"""
+        self.__id = player_id
+
     def set_longest_road(self, val: bool) -> None:
         self.__has_longest_road = val
 
@@ -275,9 +272,14 @@ class Player:
 
     # agent interface #
     def choose(self, moves: List[Moves.Move],
-               state: GameSession.GameSession) -> Moves.Move:
-        """new choosing interface, should be cleaner"""
-        return self.__agent.choose(moves, self, state)
+               state: GameSession.GameSession, budget: Budget.Budget = None) -> Moves.Move:
+        """new choosing interface, should be cleaner. budget bounds the agent's thinking (see Agent.choose)"""
+        return self.__agent.choose(moves, self, state, budget)
+
+    def sample(self, move_counts: Dict[Tuple[Moves.MoveType, GameSession.MoveSubtype], int]) \
+            -> Tuple[Moves.MoveType, GameSession.MoveSubtype, int]:
+        """draws a move by its kind and index, for agents that sample their moves (see Agent.sample)"""
+        return self.__agent.sample(move_counts, self)
 
     def __eq__(self, other: Player) -> bool:
         if other is None:
@@ -285,7 +287,13 @@ class Player:
         return self.get_id() == other.get_id()
 
     def __repr__(self) -> str:
-        return self.__name
+        return self.__name if self.__name is not None else f'Player{self.get_id()}'
 
     def __hash__(self):
         return self.get_id()
+
+    def __getstate__(self):
+        # copies of the player (i.e. inside copies of the game) start with an empty agent context
+        state = self.__dict__.copy()
+        state['_Player__agent_context'] = None
+        return state
@@ -0,0 +1,74 @@
+from __future__ import annotations
+from typing import List, Dict
+from collections import Counter
+import GameConstants as Consts
+import GameSession
+import Dice
+import Moves
+import Player
+
+"""
+A module for valuing robber placements (a 7's or a knight's) straight from the board, without simulating them: the
+production the robber blocks for every opponent (weighted by its VP lead) and for the player itself, plus the
+expected value of the card stolen, by the cards everyone knows the victim may hold (see CardTracker).
+"""
+
+BLOCKED_ROLLS = Consts.MAX_PLAYERS  # rolls the robber is expected to stay for (about a round of turns)
+VP_LEAD_WEIGHT = 0.25  # extra weight of an opponent's blocked production per VP it leads the player by
+NEEDED_CARD_BONUS = 1.0  # extra value of a stolen card the player holds none of
+
+
+def placement_value(state: GameSession.GameSession, move: Moves.UseKnightDevMove) -> float:
+    """:returns the value (in resource cards) of placing the robber by move for the player making it: the cards
+    the robber is expected to keep from the opponents over BLOCKED_ROLLS rolls (an opponent's count more the more
+    VP it leads by), minus the player's own, plus the expected value of the card stolen"""
+    player = _session_player(state, move.player())
+    blocked = blocked_production(state, move.hex_id())
+    value = 0.0
+    for blocked_player, production in blocked.items():
+        if blocked_player == player:
+            value -= production * BLOCKED_ROLLS
+        else:
+            vp_lead = max(0, blocked_player.vp() - player.vp())
+            value += production * BLOCKED_ROLLS * (1 + VP_LEAD_WEIGHT * vp_lead)
+
+    victim = move.take_from()
+    if victim is not None and victim != player:
+        value += steal_value(state, player, _session_player(state, victim))
+    return value
+
+
+def best_placement(moves: List[Moves.UseKnightDevMove], state: GameSession.GameSession) -> Moves.UseKnightDevMove:
+    """:returns the robber placement of moves with the highest placement_value"""
+    return max(moves, key=lambda move: placement_value(state, move))
+
+
+def blocked_production(state: GameSession.GameSession, hex_id: int) -> Dict[Player.Player, float]:
+    """:returns the cards every player with a building on the hex expects from it per roll (which the robber
+    blocks while it's there)"""
+    hex_tile = state.board().hexes()[hex_id]
+    if hex_tile.resource() == Consts.ResourceType.DESERT:
+        return {}
+    roll_prob = Dice.PROBABILITIES.get(hex_tile.token(), 0)
+    production = Counter()
+    for node in hex_tile.nodes():
+        buildable = state.board().nodes().get(node)
+        if buildable is not None:
+            num_cards = Consts.NUM_RESOURCES_PER_CITY if buildable.type() == Consts.PurchasableType.CITY \
+                else Consts.NUM_RESOURCES_PER_SETTLEMENT
+            production[buildable.player()] += roll_prob * num_cards
+    return production
+
+
+def steal_value(state: GameSession.GameSession, player: Player.Player, victim: Player.Player) -> float:
+    """:returns the expected value to player of a random card stolen from victim (by the resource distribution of
+    its hand as everyone sees it): a card is worth one, and NEEDED_CARD_BONUS more the fewer of its resource
+    player holds (for one it holds none of)"""
+    player_hand = Counter(player.resource_hand())
+    return sum(prob * (1 + NEEDED_CARD_BONUS / (1 + player_hand[card]))
+               for card, prob in state.card_tracker().resource_distribution(victim).items())
+
+
+def _session_player(state: GameSession.GameSession, player: Player.Player) -> Player.Player:
+    # the player of state equal to player (moves may be made in another copy of the game)
+    return next((p for p in state.players() if p == player), player)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+from typing import List
+import GameConstants as Consts
+import GameSession
+import Hand
+
+"""
+A module that checks the invariants of a game state (piece counts, card conservation, board / player consistency
+and awards). GameSession runs it every few applied moves, or after every move in debug mode, so the hot accessors
+of Player and Board don't have to check themselves.
+"""
+
+
+def validate(session: GameSession.GameSession, res_deck: Hand.Hand, dev_deck: Hand.Hand = None) -> None:
+    """raises AssertionError listing every invariant the session violates.
+    the dev cards are only checked if dev_deck is given, simulated sessions draw dev cards from a mock deck"""
+    errors = violations(session, res_deck, dev_deck)
+    if errors:
+        raise AssertionError('game state invariants violated:\n' + '\n'.join(errors))
+
+
+def violations(session: GameSession.GameSession, res_deck: Hand.Hand, dev_deck: Hand.Hand = None) -> List[str]:
+    """:returns a list of descriptions of the invariants the session violates (empty if the state is valid)"""
+    return (piece_violations(session) +
+            resource_violations(session, res_deck) +
+            (dev_violations(session, dev_deck) if dev_deck is not None else []) +
+            board_violations(session) +
+            award_violations(session))
+
+
+def piece_violations(session: GameSession.GameSession) -> List[str]:
+    errors = []
+    for player in session.players():
+        for pieces, num_pieces, max_pieces in (
+                ('settlements', player.num_settlements(), Consts.MAX_SETTLEMENTS_PER_PLAYER),
+                ('cities', player.num_cities(), Consts.MAX_CITIES_PER_PLAYER),
+                ('roads', player.num_roads(), Consts.MAX_ROADS_PER_PLAYER)):
+            if not 0 <= num_pieces <= max_pieces:
+                errors.append(f'player {player} has {num_pieces} {pieces}, max is {max_pieces}')
+    return errors
+
+
+def resource_violations(session: GameSession.GameSession, res_deck: Hand.Hand) -> List[str]:
+    errors = []
+    for resource, amount in Consts.RESOURCE_COUNTS.items():
+        in_hands = sum(p.resource_hand().cards_of_type(resource).size() for p in session.players())
+        in_deck = res_deck.cards_of_type(resource).size()
+        if in_hands + in_deck != amount:
+            errors.append(f'{in_deck} {resource} in deck + {in_hands} in hands != {amount}')
+    return errors
+
+
+def dev_violations(session: GameSession.GameSession, dev_deck: Hand.Hand) -> List[str]:
+    errors = []
+    for dev_type, amount in Consts.DEV_COUNTS.items():
+        in_hands = sum(p.dev_hand().cards_of_type(dev_type).size() + p.used_dev_hand().cards_of_type(dev_type).size()
+                       for p in session.players())
+        in_deck = dev_deck.cards_of_type(dev_type).size()
+        if in_hands + in_deck != amount:
+            errors.append(f'{in_deck} {dev_type} in deck + {in_hands} in hands != {amount}')
+    return errors
+
+
+def board_violations(session: GameSession.GameSession) -> List[str]:
+    errors = []
+    board = session.board()
+    for player in session.players():
+        for coords, on_board, btype in ((player.settlement_nodes(), board.nodes(), Consts.PurchasableType.SETTLEMENT),
+                                        (player.city_nodes(), board.nodes(), Consts.PurchasableType.CITY),
+                                        (player.road_edges(), board.edges(), Consts.PurchasableType.ROAD)):
+            for coord in coords:
+                buildable = on_board.get(coord)
+                if buildable is None or buildable.player() != player or buildable.type() != btype:
+                    errors.append(f'player {player} has a {btype} at {hex(coord)}, board has {buildable}')
+
+        prob = board.probability_score(player)
+        if not 0 <= prob <= 1:
+            errors.append(f'player {player} probability score is {prob}')
+        expected = board.expectation_score(player)
+        if expected < 0:
+            errors.append(f'player {player} expectation score is {expected}')
+
+    num_nodes = sum(p.num_settlements() + p.num_cities() for p in session.players())
+    if num_nodes != len(board.nodes()):
+        errors.append(f'{len(board.nodes())} buildables on board nodes, players own {num_nodes}')
+    num_edges = sum(p.num_roads() for p in session.players())
+    if num_edges != len(board.edges()):
+        errors.append(f'{len(board.edges())} roads on board edges, players own {num_edges}')
+    return errors
+
+
+def award_violations(session: GameSession.GameSession) -> List[str]:
+    errors = []
+    army_holders = [p for p in session.players() if p.has_largest_army()]
+    if len(army_holders) > 1:
+        errors.append(f'players {army_holders} all hold the largest army')
+    for player in army_holders:
+        if player.army_size() < max(Consts.MIN_LARGEST_ARMY_SIZE, session.largest_army_size()):
+            errors.append(f'player {player} holds the largest army with {player.army_size()} knights')
+
+    road_holders = [p for p in session.players() if p.has_longest_road()]
+    if len(road_holders) > 1:
+        errors.append(f'players {road_holders} all hold the longest road')
+    for player in road_holders:
+        road_len = session.board().road_len(player)
+        if road_len < max(Consts.MIN_LONGEST_ROAD_SIZE, session.longest_road_length()):
+            errors.append(f'player {player} holds the longest road with a road of length {road_len}')
+    return errors
@@ -0,0 +1,188 @@
+from __future__ import annotations
+from typing import List, Tuple, Union, Dict
+from collections import Counter, deque
+from copy import deepcopy
+import GameConstants as Consts
+import GameSession
+import Board
+import Dice
+import Hand
+import Moves
+import hexgrid
+
+"""
+A module for planning the rest of a turn at once: the end-of-turn outcomes (the purchases made and the hand left)
+the current player can reach by trading with the deck and buying, found by a breadth first search over resource
+count vectors instead of game states, and the moves that play every one of them out.
+"""
+
+MAX_PLANNED_HANDS = 3000  # (hand, purchases) states the search visits at most
+MAX_PLANNED_ROADS = 2  # roads a plan buys at most
+# the purchases a plan makes, in the order its moves make them (roads first, they may lead to settlement spots)
+PLAN_PURCHASES = (Consts.PurchasableType.ROAD,
+                  Consts.PurchasableType.SETTLEMENT,
+                  Consts.PurchasableType.CITY,
+                  Consts.PurchasableType.DEV_CARD)
+
+CountVector = Tuple[int, ...]  # a count of every yielding resource, in Consts.YIELDING_RESOURCES order
+Trade = Tuple[Consts.ResourceType, int, Consts.ResourceType]  # (resource given, amount given, resource received)
+_PlanNode = Tuple[CountVector, CountVector]  # (hand, purchases by PLAN_PURCHASES)
+
+
+class TurnPlan:
+    """The purchases a player makes in the rest of its turn, the trades with the deck that afford them (in the order
+    they are made) and the resources left in its hand after them"""
+    def __init__(self, purchases: Dict[Consts.PurchasableType, int], trades: List[Trade], hand_after: CountVector):
+        self.__purchases = purchases
+        self.__trades = trades
+        self.__hand_after = hand_after
+
+    def purchases(self) -> Dict[Consts.PurchasableType, int]:
+        """:returns the number of every purchasable bought"""
+        return self.__purchases
+
+    def num_purchases(self) -> int:
+        """:returns the total number of purchases"""
+        return sum(self.__purchases.values())
+
+    def trades(self) -> List[Trade]:
+        """:returns the trades with the deck, as (resource given, amount given, resource received), in order"""
+        return self.__trades
+
+    def hand_after(self) -> Hand.Hand:
+        """:returns the resources left after the plan"""
+        return Hand.Hand(*(resource for resource, count in zip(Consts.YIELDING_RESOURCES, self.__hand_after)
+                           for _ in range(count)))
+
+    def __str__(self) -> str:
+        purchases = {purchasable.name: count for purchasable, count in self.__purchases.items() if count}
+        return f'[PLAN] purchases = {purchases}, trades = {len(self.__trades)}, hand after = {self.hand_after()}'
+
+
+def plan_turn(state: GameSession.GameSession) -> List[TurnPlan]:
+    """:returns every end-of-turn outcome the current player of state can reach from its main phase decision by
+    trading with the deck (at its best rates, for resources the deck holds) and buying roads, settlements, cities
+    and dev cards, with the trades each outcome needs. trades that afford no purchase are left out, so every plan
+    but the empty one ends with a purchase. the purchases are limited by the pieces left and the spots to build on
+    (a settlement spot for every road bought too), so some plans may not be playable (see play_plan)"""
+    player = state.current_player()
+    ratios = state.trade_ratios(player)
+    hand = _count_vector(player.resource_hand())
+    bank = _count_vector(state.bank_resources())
+    costs = [_count_vector(Consts.COSTS[purchasable]) for purchasable in PLAN_PURCHASES]
+    num_spots = {purchasable: len(state.buildable_spots(player, purchasable)) for purchasable in PLAN_PURCHASES
+                 if purchasable != Consts.PurchasableType.DEV_CARD}
+    max_roads = min(MAX_PLANNED_ROADS, num_spots[Consts.PurchasableType.ROAD])
+    max_settlements = Consts.MAX_SETTLEMENTS_PER_PLAYER - player.num_settlements()
+    max_cities = Consts.MAX_CITIES_PER_PLAYER - player.num_cities()
+
+    def can_buy(purchase_index: int, purchases: CountVector) -> bool:
+        num_roads, num_settlements, num_cities, num_devs = purchases
+        purchasable = PLAN_PURCHASES[purchase_index]
+        if purchasable == Consts.PurchasableType.ROAD:
+            return num_roads < max_roads
+        elif purchasable == Consts.PurchasableType.SETTLEMENT:
+            return num_settlements < min(max_settlements, num_spots[purchasable] + num_roads)
+        elif purchasable == Consts.PurchasableType.CITY:
+            return num_cities < min(max_cities, player.num_settlements() + num_settlements)
+        return num_devs < state.num_devs_left()
+
+    def successors(node: _PlanNode):
+        node_hand, purchases = node
+        spent = [sum(cost[i] * count for cost, count in zip(costs, purchases)) for i in range(len(hand))]
+        for purchase_index, cost in enumerate(costs):
+            if can_buy(purchase_index, purchases) and all(have >= need for have, need in zip(node_hand, cost)):
+                new_purchases = tuple(count + (i == purchase_index) for i, count in enumerate(purchases))
+                yield None, (tuple(have - need for have, need in zip(node_hand, cost)), new_purchases)
+        for i_out, resource_out in enumerate(Consts.YIELDING_RESOURCES):
+            if node_hand[i_out] < ratios[resource_out]:
+                continue
+            for i_in, resource_in in enumerate(Consts.YIELDING_RESOURCES):
+                # purchases are counted as not returned to the deck, so the trades can be made before them
+                bank_in = bank[i_in] + hand[i_in] - node_hand[i_in] - spent[i_in]
+                if i_in != i_out and bank_in > 0:
+                    new_hand = list(node_hand)
+                    new_hand[i_out] -= ratios[resource_out]
+                    new_hand[i_in] += 1
+                    yield (resource_out, ratios[resource_out], resource_in), (tuple(new_hand), purchases)
+
+    root = (hand, (0,) * len(PLAN_PURCHASES))
+    parents = {root: None}  # node -> (parent node, trade made or None for a purchase)
+    outcomes = {root: None}  # the nodes a purchase reaches (and the root), in the order they're reached
+    queue = deque([root])
+    while queue and len(parents) < MAX_PLANNED_HANDS:
+        node = queue.popleft()
+        for trade, child in successors(node):
+            if trade is None:
+                outcomes[child] = None
+            if child not in parents:
+                parents[child] = (node, trade)
+                queue.append(child)
+
+    return [_make_plan(outcome, parents) for outcome in outcomes]
+
+
+def play_plan(state: GameSession.GameSession, plan: TurnPlan
+              ) -> Union[Tuple[GameSession.GameSession, List[Moves.Move]], None]:
+    """plays plan on a copy of state: its trades, then its purchases (roads, settlements, cities and dev cards), each
+    build on the spot that produces the most (a road by the best free spot it touches).
+    :returns the copy reached (before passing) and the moves played, None if plan can't be played"""
+    new_state = deepcopy(state)
+    player = new_state.current_player()
+    moves_played = []
+    for resource_out, amount_out, resource_in in plan.trades():
+        trade_key = Moves.TradeMove(player, Hand.Hand(*[resource_out] * amount_out), Hand.Hand(resource_in)).key()
+        move = next((move for move in new_state.possible_moves_of_type(Moves.MoveType.TRADE)
+                     if move.key() == trade_key), None)
+        if move is None:
+            return None
+        new_state.simulate_game(move, lazy=True)
+        moves_played.append(move)
+
+    for purchasable in PLAN_PURCHASES:
+        for _ in range(plan.purchases()[purchasable]):
+            if purchasable == Consts.PurchasableType.DEV_CARD:
+                moves = list(new_state.possible_moves_of_type(Moves.MoveType.BUY_DEV))
+            else:
+                moves = list(new_state.possible_moves_of_type(Moves.MoveType.BUILD, purchasable))
+            if not moves:
+                return None
+            move = max(moves, key=lambda m: _spot_production(new_state, m))
+            new_state.simulate_game(move, lazy=True)
+            moves_played.append(move)
+    return new_state, moves_played
+
+
+def _make_plan(outcome: _PlanNode, parents: Dict[_PlanNode, Union[Tuple[_PlanNode, Union[Trade, None]], None]]
+               ) -> TurnPlan:
+    trades = []
+    node = outcome
+    while parents[node] is not None:
+        node, trade = parents[node]
+        if trade is not None:
+            trades.append(trade)
+    hand_after, purchases = outcome
+    return TurnPlan(dict(zip(PLAN_PURCHASES, purchases)), trades[::-1], hand_after)
+
+
+def _count_vector(cards: Hand.Hand) -> CountVector:
+    counts = Counter(cards)
+    return tuple(counts[resource] for resource in Consts.YIELDING_RESOURCES)
+
+
+def _spot_production(state: GameSession.GameSession, move: Moves.Move) -> float:
+    # the probability of a roll producing at the spot of a build, for a road the best free spot it touches
+    if move.get_type() != Moves.MoveType.BUILD:
+        return 0.0
+    if move.builds() != Consts.PurchasableType.ROAD:
+        return _node_production(state, move.at())
+    free_nodes = [node for node in hexgrid.nodes_touching_edge(move.at())
+                  if node in Board.LEGAL_NODES and
+                  all(state.board().nodes().get(adj) is None
+                      for adj in Board.Board.get_adj_nodes_to_node(node) + [node])]
+    return max((_node_production(state, node) for node in free_nodes), default=0.0)
+
+
+def _node_production(state: GameSession.GameSession, node: int) -> float:
+    return sum(Dice.PROBABILITIES.get(state.board().hexes()[hex_id].token(), 0)
+               for hex_id in Board.Board.get_adj_tile_ids_to_node(node))
@@ -0,0 +1,237 @@
+from __future__ import annotations
+from typing import List, Union, Set, Tuple
+from collections import Counter
+from copy import deepcopy
+import GameConstants as Consts
+import GameSession
+import Hand
+import Moves
+import Player
+import TurnPlanner
+
+"""
+A module for finding forced wins: whether the current player can reach WINNING_VP within its turn (by its hand,
+trade rates, dev cards, buildable spots and the awards) and the moves that do, and which players might win on
+their next turn. A counting bound on the VP a turn can gain rules out almost every turn before any move is searched,
+the builds and trades that win are planned over hand counts (see TurnPlanner), and only wins that need the longest
+road are searched move by move.
+"""
+
+MAX_SEARCHED_STATES = 300  # the search for a win gives up (finds none) after copying this many states
+SOLVER_MOVE_ORDER = ((Moves.MoveType.BUILD, Consts.PurchasableType.CITY),
+                     (Moves.MoveType.BUILD, Consts.PurchasableType.SETTLEMENT),
+                     (Moves.MoveType.USE_DEV, None),
+                     (Moves.MoveType.BUILD, Consts.PurchasableType.ROAD),
+                     (Moves.MoveType.TRADE, None))
+ROBBER_STEAL = 1  # cards the player rolling a 7 may steal
+
+
+def winning_moves(state: GameSession.GameSession) -> Union[List[Moves.Move], None]:
+    """:returns moves that win the game this turn for the current player, from its main phase decision in state
+    (the pass ending the turn included). None if no sequence of moves with known outcomes wins.
+    buying dev cards and robbing someone aren't searched"""
+    moves = state.possible_moves() if not state.is_game_over() else []
+    if not any(move.get_type() == Moves.MoveType.PASS for move in moves):  # not a main phase decision
+        return None
+    player = state.current_player()
+    devs = usable_devs(state)
+    if player.vp() + max_vp_gain(state, player, player.resource_hand_size(), devs) < Consts.WINNING_VP:
+        return None
+
+    # a dev card is as good used first as later in the turn, the builds and trades after it are planned
+    for dev_move in [None] + [move for move in moves if move.get_type() == Moves.MoveType.USE_DEV and
+                              _known_outcome(move)]:
+        dev_state = state
+        if dev_move is not None:
+            dev_state = deepcopy(state)
+            dev_state.simulate_game(dev_move, lazy=True)
+        win = _planned_win(dev_state)
+        if win is not None:
+            return ([dev_move] if dev_move is not None else []) + win
+
+    # a plan's roads aren't placed for length, wins that need the longest road are searched
+    if player.vp() + max_vp_gain(state, player, player.resource_hand_size(), devs, road_award=False) >= \
+            Consts.WINNING_VP:
+        return None
+    return _Search(state).winning_moves()
+
+
+def next_turn_threats(state: GameSession.GameSession, player: Player.Player) -> List[Player.Player]:
+    """:returns the opponents of player that might win on their next turn: by the counting bound of the VP
+    they can gain with their hand, their best roll and any dev card they hold (so none is missed, but some of
+    them can't actually win). public information only: an opponent's played VP (see Player.vp), its hand size,
+    and every dev card it holds counted as any dev type player hasn't seen"""
+    threats = []
+    for opp in state.players():
+        if opp == player:
+            continue
+        best_roll_income = max(state.board().resource_distributions(dice_sum).get(opp, Hand.Hand()).size()
+                               for dice_sum in range(2, 13) if dice_sum != Consts.ROBBER_DICE_VALUE)
+        num_cards = opp.resource_hand_size() + max(best_roll_income, ROBBER_STEAL)
+        devs = set(state.card_tracker().unseen_devs(player)) if opp.dev_hand_size() else set()
+        if opp.vp() + max_vp_gain(state, opp, num_cards, devs) >= Consts.WINNING_VP:
+            threats.append(opp)
+    return threats
+
+
+def usable_devs(state: GameSession.GameSession) -> Set[Consts.DevType]:
+    """:returns the dev cards the current player can use at its current main phase decision"""
+    return set(state.possible_move_subtypes(Moves.MoveType.USE_DEV))
+
+
+def max_vp_gain(state: GameSession.GameSession, player: Player.Player, num_cards: int,
+                devs: Set[Consts.DevType], road_award: bool = True) -> int:
+    """:returns an upper bound on the VP player can gain in a turn with num_cards resource cards and devs usable
+    (one of them): every card buys at most a quarter of a settlement (trades only lose cards), and the awards
+    are gained if the cards or the dev card can reach them (the longest road only if road_award). a monopoly is
+    bounded by the most cards of a resource the opponents may hold, as everyone sees it (see CardTracker)"""
+    num_opp_cards = Counter()
+    for opp in state.players():
+        if opp != player:
+            for resource, (_, most) in state.card_tracker().resource_bounds(opp).items():
+                num_opp_cards[resource] += most
+
+    # (extra cards, VP, free roads) of every way to use a dev card this turn (or none)
+    dev_options = [(0, 0, 0)]
+    if Consts.DevType.VP in devs:
+        dev_options.append((0, Consts.VP_DEV_CARD, 0))
+    if Consts.DevType.KNIGHT in devs:
+        dev_options.append((ROBBER_STEAL, _army_award(state, player), 0))
+    if Consts.DevType.YEAR_OF_PLENTY in devs:
+        dev_options.append((Consts.YOP_NUM_RESOURCES, 0, 0))
+    if Consts.DevType.MONOPOLY in devs:
+        dev_options.append((max(num_opp_cards.values(), default=0), 0, 0))
+    if Consts.DevType.ROAD_BUILDING in devs:
+        dev_options.append((0, 0, Consts.ROAD_BUILDING_NUM_ROADS))
+
+    roads_left = Consts.MAX_ROADS_PER_PLAYER - player.num_roads()
+    roads_for_award = _roads_for_road_award(state, player) if road_award else None
+    road_cost = Consts.COSTS[Consts.PurchasableType.ROAD].size()
+    best_gain = 0
+    for extra_cards, dev_vp, free_roads in dev_options:
+        cards = num_cards + extra_cards
+        gain = dev_vp + _build_vp(player, cards)
+        if roads_for_award is not None and roads_for_award <= roads_left:
+            roads_bought = max(0, roads_for_award - free_roads)
+            if roads_bought * road_cost <= cards:
+                gain = max(gain, dev_vp + Consts.VP_LONGEST_ROAD + _build_vp(player, cards - roads_bought * road_cost))
+        best_gain = max(best_gain, gain)
+    return best_gain
+
+
+def _planned_win(state: GameSession.GameSession) -> Union[List[Moves.Move], None]:
+    # the moves of a plan of builds and trades that wins, with the pass, from the current player's decision
+    player = state.current_player()
+    if player.vp() + max_vp_gain(state, player, player.resource_hand_size(), set()) < Consts.WINNING_VP:
+        return None
+    purchases_tried = set()
+    for plan in TurnPlanner.plan_turn(state):
+        purchases = tuple(plan.purchases().items())
+        if player.vp() + _plan_vp(plan) < Consts.WINNING_VP or purchases in purchases_tried:
+            continue
+        purchases_tried.add(purchases)
+        played = TurnPlanner.play_plan(state, plan)
+        if played is not None and played[0].current_player().vp() >= Consts.WINNING_VP:
+            plan_state, plan_moves = played
+            return plan_moves + list(plan_state.possible_moves_of_type(Moves.MoveType.PASS))
+    return None
+
+
+def _plan_vp(plan: TurnPlanner.TurnPlan) -> int:
+    # the VP the settlements and cities of plan gain
+    return (plan.purchases()[Consts.PurchasableType.SETTLEMENT] * Consts.VP_SETTLEMENT +
+            plan.purchases()[Consts.PurchasableType.CITY] * (Consts.VP_CITY - Consts.VP_SETTLEMENT))
+
+
+def _known_outcome(move: Moves.Move) -> bool:
+    # a knight that robs a card has a random outcome, any other move a known one
+    if isinstance(move, Moves.UseKnightDevMove):
+        return move.take_from() is None or len(move.take_from().resource_hand()) == 0
+    return True
+
+
+def _build_vp(player: Player.Player, num_cards: int) -> int:
+    # the most VP num_cards buy in settlements and cities (the cheapest first), by the pieces left
+    settlement_cost = Consts.COSTS[Consts.PurchasableType.SETTLEMENT].size()
+    city_cost = Consts.COSTS[Consts.PurchasableType.CITY].size()
+    num_settlements = min(num_cards // settlement_cost,
+                          Consts.MAX_SETTLEMENTS_PER_PLAYER - player.num_settlements())
+    num_cities = min((num_cards - num_settlements * settlement_cost) // city_cost,
+                     Consts.MAX_CITIES_PER_PLAYER - player.num_cities(),
+                     player.num_settlements() + num_settlements)
+    return ((Consts.VP_SETTLEMENT * num_settlements) +
+            (Consts.VP_CITY - Consts.VP_SETTLEMENT) * num_cities)
+
+
+def _army_award(state: GameSession.GameSession, player: Player.Player) -> int:
+    # VP a knight gains by the largest army
+    if player.has_largest_army():
+        return 0
+    other_armies = [p.army_size() for p in state.players() if p != player]
+    army_size = player.army_size() + 1
+    return Consts.VP_LARGEST_ARMY if army_size >= max(Consts.MIN_LARGEST_ARMY_SIZE, *other_armies) else 0
+
+
+def _roads_for_road_award(state: GameSession.GameSession, player: Player.Player) -> Union[int, None]:
+    # the fewest roads player has to build for the longest road (every road lengthens it by one at most),
+    # None if it holds the award already
+    if player.has_longest_road():
+        return None
+    other_lengths = [state.board().road_len(p) for p in state.players() if p != player]
+    target_length = max(Consts.MIN_LONGEST_ROAD_SIZE, *other_lengths)
+    return max(1, target_length - state.board().road_len(player))
+
+
+class _Search:
+    """A depth first search over the moves of a turn with known outcomes (builds, trades, dev cards but knights
+    that rob someone), pruned by the counting bound and by the states already searched"""
+    def __init__(self, state: GameSession.GameSession):
+        self.__root = state
+        self.__seen = set()
+        self.__num_searched = 0
+
+    def winning_moves(self) -> Union[List[Moves.Move], None]:
+        path = self.__search(self.__root)
+        return path[::-1] if path is not None else None
+
+    def __search(self, state: GameSession.GameSession) -> Union[List[Moves.Move], None]:
+        # the winning moves from state, in reverse order
+        player = state.current_player()
+        moves = state.possible_moves()
+        if player.vp() >= Consts.WINNING_VP:
+            return [next(move for move in moves if move.get_type() == Moves.MoveType.PASS)]
+        if player.vp() + max_vp_gain(state, player, player.resource_hand_size(), usable_devs(state)) < \
+                Consts.WINNING_VP:
+            return None
+
+        for move in _Search.__candidates(moves):
+            if self.__num_searched >= MAX_SEARCHED_STATES:
+                return None
+            self.__num_searched += 1
+            next_state = deepcopy(state)
+            next_state.simulate_game(move, lazy=True)
+            state_key = _Search.__state_key(next_state)
+            if state_key in self.__seen:
+                continue
+            self.__seen.add(state_key)
+            path = self.__search(next_state)
+            if path is not None:
+                return path + [move]
+        return None
+
+    @staticmethod
+    def __candidates(moves: List[Moves.Move]) -> List[Moves.Move]:
+        # the moves with known outcomes, the ones likelier to win first
+        def kind(move: Moves.Move) -> Tuple:
+            return move.get_type(), move.builds() if move.get_type() == Moves.MoveType.BUILD else None
+
+        candidates = [move for move in moves if kind(move) in SOLVER_MOVE_ORDER and _known_outcome(move)]
+        return sorted(candidates, key=lambda move: SOLVER_MOVE_ORDER.index(kind(move)))
+
+    @staticmethod
+    def __state_key(state: GameSession.GameSession) -> Tuple:
+        # the state of the current player's turn, moves played in any order reach the same key
+        player = state.current_player()
+        return (tuple(sorted(Counter(player.resource_hand()).items(), key=str)),
+                frozenset(player.settlement_nodes()), frozenset(player.city_nodes()), frozenset(player.road_edges()),
+                len(player.used_dev_hand()), state.board().robber_hex().id(), player.vp())
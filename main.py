@@ -13,6 +13,10 @@ HUMAN_AGENT = 'human'
 PROBABILITY_AGENT = 'prob'
 MONTECARLO_AGENT = 'monte'
 GENETIC_AGENT = 'genetic'
+UCT_AGENT = 'uct'
+RULE_BASED_AGENT = 'rules'
+EXPECTIMAX_AGENT = 'expectimax'
+PLANNING_AGENT = 'planner'
 GENETIC_WEIGHTS = (0.77197979,
                    0.8782323,
                    0.07241402,
@@ -22,13 +26,18 @@ GENETIC_WEIGHTS = (0.77197979,
                    0.37266962,
                    0.15663299,
                    0.19536229)
+# agents hold only their configuration (see Agent.AgentContext), so all the players of a type share one instance
 AGENTS = {
     RANDOM_AGENT: Agent.RandomAgent(),
     ONE_MOVE_AGENT: Agent.OneMoveHeuristicAgent(Heuristics.AmossComb1()),
     HUMAN_AGENT: Agent.HumanAgent(),
     PROBABILITY_AGENT: Agent.ProbabilityAgent(),
     MONTECARLO_AGENT: Agent.MonteCarloAgent(Heuristics.Everything()),
-    GENETIC_AGENT: Agent.MonteCarloAgent(Heuristics.Everything(weights=GENETIC_WEIGHTS))
+    GENETIC_AGENT: Agent.MonteCarloAgent(Heuristics.Everything(weights=GENETIC_WEIGHTS)),
+    UCT_AGENT: Agent.UCTAgent(Heuristics.Everything()),
+    RULE_BASED_AGENT: Agent.RuleBasedAgent(),
+    EXPECTIMAX_AGENT: Agent.ExpectimaxAgent(Heuristics.Everything()),
+    PLANNING_AGENT: Agent.TurnPlanningAgent(Heuristics.Everything())
 }
 DEFAULT_AGENTS = [RANDOM_AGENT]
 PLAYER_NAMES = ['Roy', 'Boaz', 'Oriane', 'Amoss']
@@ -55,6 +64,22 @@ def get_args() -> argparse.Namespace:
         default=DEFAULT_NUM_PLAYERS,
         help='Number of players to play this round of Catan'
     )
+    parser.add_argument(
+        '-prune_moves',
+        action='store_true',
+        help='Drop dominated moves and collapse equivalent ones before they reach the agents'
+    )
+    parser.add_argument(
+        '-validate_every',
+        type=int,
+        default=0,
+        help='Check the game state invariants every this many moves (0 = never)'
+    )
+    parser.add_argument(
+        '-decision_time',
+        type=float,
+        help='Seconds every agent may think per decision (searching agents answer with their best move so far)'
+    )
     return parser.parse_args()
 
 
@@ -71,9 +96,10 @@ def init_players(num_players: int, *agent_types: str) -> List[Player.Player]:
 
 
 def main(log: str = None, num_players: int = DEFAULT_NUM_PLAYERS, agents: List[str] = DEFAULT_AGENTS,
-         **kwargs) -> None:
+         prune_moves: bool = False, validate_every: int = 0, decision_time: float = None, **kwargs) -> None:
     players = init_players(num_players, *agents)
-    catan_session = GameSession.GameSession(log, *players)
+    catan_session = GameSession.GameSession(log, *players, prune_moves=prune_moves, validate_every=validate_every,
+                                            decision_time=decision_time)
     catan_session.run_game()
 
 